@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_agentprofile_amount_in_hand'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agentprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
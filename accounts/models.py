@@ -10,6 +10,7 @@ class AgentProfile(models.Model):
     amount_in_hand = models.DecimalField(
         max_digits=12, decimal_places=2, default=Decimal('0.00')
     )
+    updated_at = models.DateTimeField(auto_now=True)  # sync cursor
 
     def __str__(self):
         return self.user.username
@@ -0,0 +1,26 @@
+# Loaded automatically by gunicorn from the working directory.
+import glob
+import os
+import tempfile
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "microfinance.settings")
+
+from django.conf import settings  # noqa: E402
+
+# Workers add up their metrics through files in PROMETHEUS_MULTIPROC_DIR, which
+# prometheus_client reads once at import; workers forked from here inherit it.
+METRICS_DIR = settings.PROMETHEUS_MULTIPROC_DIR or os.path.join(tempfile.gettempdir(), "microfinance-metrics")
+os.environ["PROMETHEUS_MULTIPROC_DIR"] = METRICS_DIR
+os.makedirs(METRICS_DIR, exist_ok=True)
+
+from prometheus_client import multiprocess  # noqa: E402
+
+
+def on_starting(server):
+    # Counters from a previous run would otherwise be added to this one's
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.db")):
+        os.remove(path)
+
+
+def child_exit(server, worker):
+    multiprocess.mark_process_dead(worker.pid)
@@ -1,7 +1,31 @@
 from django.contrib import admin
-from .models import AgentProfile, Customer, Loan, Repayment
+from .models import AgentProfile, CashLedgerEntry, Customer, Loan, LoanInstallment, LoanProduct, Repayment
 
 admin.site.register(AgentProfile)
 admin.site.register(Customer)
 admin.site.register(Loan)
+admin.site.register(LoanInstallment)
 admin.site.register(Repayment)
+admin.site.register(LoanProduct)
+
+
+@admin.register(CashLedgerEntry)
+class CashLedgerEntryAdmin(admin.ModelAdmin):
+    """
+    View-only: the ledger is append-only and an agent's amount_in_hand is its
+    sum, so corrections are new entries posted with loans.ledger.post_entry.
+    """
+    list_display = ("created_at", "agent", "kind", "amount", "loan")
+    list_filter = ("kind",)
+
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .replicas import primary
+
+TOTALS_KEY = "loans:admin_totals"
+TOTALS_VERSION_KEY = "loans:admin_totals:version"
+TOTALS_LOCK_KEY = "loans:admin_totals:lock"
+# Totals are recomputed after this long even without a change signal
+TOTALS_CACHE_SECONDS = getattr(settings, "ADMIN_TOTALS_CACHE_SECONDS", 300)
+# Longest a recompute may hold the lock before another worker takes over
+TOTALS_LOCK_SECONDS = 30
+
+
+def compute_totals():
+    """Headline figures for the admin dashboard, straight from the database."""
+    from .models import AdminTransactionRequest, Customer, Loan, LoanSettings  # avoid circular import
+
+    pending = AdminTransactionRequest.objects.filter(status="pending").select_related("agent__user")
+    return {
+        "total_customers": Customer.objects.count(),
+        "total_loans": Loan.objects.count(),
+        # Overdue and defaulted loans still owe money, so they count as active here
+        "active_loans": Loan.objects.filter(status__in=Loan.OPEN_STATUSES).count(),
+        "loan_settings": LoanSettings.objects.first(),
+        # Only what the dashboard shows, so the cached rows carry no user details
+        "pending_requests": list(pending.only(
+            "id", "requested_amount", "created_at", "agent__id", "agent__user__id", "agent__user__username",
+        )),
+    }
+
+
+def get_totals():
+    """
+    ``compute_totals`` through the cache.
+
+    The cached entry records the version it was computed at; a change signal
+    moves the version on. When the entry is out of date one worker takes the
+    lock and recomputes while the others keep serving the old entry.
+    """
+    version = cache.get(TOTALS_VERSION_KEY, 0)
+    entry = cache.get(TOTALS_KEY)
+    if entry and entry["version"] == version and entry["fresh_until"] > time.time():
+        return entry["totals"]
+
+    locked = cache.add(TOTALS_LOCK_KEY, 1, TOTALS_LOCK_SECONDS)
+    if not locked and entry:
+        return entry["totals"]
+    try:
+        # From the primary even in a replica view: a lagging replica would
+        # cache figures from before the change that triggered the recompute
+        with primary():
+            totals = compute_totals()
+        cache.set(TOTALS_KEY, {
+            "version": version,
+            "fresh_until": time.time() + TOTALS_CACHE_SECONDS,
+            "totals": totals,
+        }, None)
+    finally:
+        if locked:
+            cache.delete(TOTALS_LOCK_KEY)
+    return totals
+
+
+def _bump_version():
+    try:
+        cache.incr(TOTALS_VERSION_KEY)
+    except ValueError:
+        cache.set(TOTALS_VERSION_KEY, 1, None)
+
+
+def invalidate_totals(using=None, **kwargs):
+    """
+    Signal handler: mark the admin totals out of date.
+
+    The version moves on only once the change commits, so a recompute
+    started in between cannot cache the old figures under the new version.
+    Bulk writes that skip signals call this directly.
+    """
+    transaction.on_commit(_bump_version, using=using)
@@ -0,0 +1,85 @@
+import asyncio
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import PermissionDenied
+from django.db.models import Max, Sum
+from django.shortcuts import aget_object_or_404, render
+from django.utils.decorators import method_decorator
+from django.views import View
+
+from accounts.models import AgentProfile
+
+from .admin_totals import get_totals
+from .dashboard import aagent_collection_summary
+from .models import AgentDailyStats, Customer, Loan
+from .replicas import read_from_replica
+from .search import search_customers
+
+# Async versions of the read-heavy pages, routed in place of the sync ones under
+# ASGI (settings.ASGI). The event loop keeps serving other requests while their
+# queries run. Templates render in a thread because they may follow a relation lazily.
+
+
+class AsyncAgentDashboardView(View):
+    template_name = "loans/agent_dashboard.html"
+
+    async def get(self, request, *args, **kwargs):
+        agent_profile = await aget_object_or_404(AgentProfile, user=await request.auser())
+
+        name_query = request.GET.get("name", "").strip()
+        phone_query = request.GET.get("phone", "").strip()
+        searched = bool(name_query or phone_query)
+        if searched:
+            summary, customers = await asyncio.gather(
+                aagent_collection_summary(agent_profile),
+                sync_to_async(search_customers)(agent_profile, name=name_query, phone=phone_query),
+            )
+        else:
+            summary, customers = await aagent_collection_summary(agent_profile), None
+
+        context = {
+            "agent": agent_profile,
+            "amount_in_hand": agent_profile.amount_in_hand,
+            "customers": customers,
+            "searched": searched,
+            **summary,
+        }
+        return await sync_to_async(render)(request, self.template_name, context)
+
+
+@method_decorator(read_from_replica, name="dispatch")
+class AsyncAdminDashboardView(View):
+    async def get(self, request):
+        user = await request.auser()
+        if not (user.is_superuser or user.is_staff):
+            raise PermissionDenied("You do not have permission to access this page.")
+
+        totals, collections_today = await asyncio.gather(
+            sync_to_async(get_totals)(),
+            AgentDailyStats.objects.filter(date=date.today()).aaggregate(
+                amount_expected=Sum("amount_expected"),
+                amount_collected=Sum("amount_collected"),
+            ),
+        )
+
+        context = {
+            **totals,
+            "amount_expected_today": collections_today["amount_expected"] or 0,
+            "amount_collected_today": collections_today["amount_collected"] or 0,
+        }
+        return await sync_to_async(render)(request, "loans/admin_dashboard.html", context)
+
+
+class AsyncCustomerHistoryView(View):
+    template_name = "loans/customer_history.html"
+
+    async def get(self, request, customer_id):
+        async def loans():
+            queryset = Loan.objects.filter(customer_id=customer_id).annotate(
+                estimated_end_date=Max("installments__due_date")
+            ).order_by("-start_date")
+            return [loan async for loan in queryset]
+
+        customer, loan_rows = await asyncio.gather(aget_object_or_404(Customer, id=customer_id), loans())
+        return await sync_to_async(render)(request, self.template_name, {"customer": customer, "loans": loan_rows})
@@ -0,0 +1,131 @@
+from datetime import date, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+
+CALENDAR_VERSION_KEY = "loans:business_calendar:version"
+
+
+class _YearTable:
+    """Business days of one calendar year, with O(1) lookups into them."""
+
+    def __init__(self, year, holidays):
+        first = date(year, 1, 1)
+        self.first_ordinal = first.toordinal()
+        self.days = []          # business days in order
+        self.ordinals = {}      # business day -> its index in ``days``
+        self.next_index = []    # day of year -> index of first business day on/after it
+
+        day = first
+        while day.year == year:
+            if day.weekday() < 5 and day not in holidays:
+                self.ordinals[day] = len(self.days)
+                self.days.append(day)
+            day += timedelta(days=1)
+
+        # Walk backwards so every calendar day knows the next business day
+        upcoming = len(self.days)
+        day -= timedelta(days=1)
+        while day.year == year:
+            if day in self.ordinals:
+                upcoming = self.ordinals[day]
+            self.next_index.append(upcoming)
+            day -= timedelta(days=1)
+        self.next_index.reverse()
+
+
+class BusinessCalendar:
+    """
+    Weekends (Sat/Sun) and PublicHoliday dates, loaded once per process.
+
+    Use ``get_calendar()`` rather than building one directly, so the holiday
+    set is shared and reloaded only when a PublicHoliday changes.
+    """
+
+    def __init__(self, holidays, version=0):
+        self.holidays = frozenset(holidays)
+        self.version = version
+        self._years = {}
+
+    def year_table(self, year):
+        table = self._years.get(year)
+        if table is None:
+            table = self._years[year] = _YearTable(year, self.holidays)
+        return table
+
+    def is_business_day(self, d: date) -> bool:
+        return d.weekday() < 5 and d not in self.holidays
+
+    def next_business_day(self, d: date) -> date:
+        """Return ``d`` if it is a business day, otherwise the next one."""
+        while True:
+            table = self.year_table(d.year)
+            index = table.next_index[d.toordinal() - table.first_ordinal]
+            if index < len(table.days):
+                return table.days[index]
+            d = date(d.year + 1, 1, 1)
+
+    def add_business_days(self, d: date, count: int) -> date:
+        """
+        Move ``count`` business days from ``d`` (negative goes backwards).
+
+        ``d`` is first rolled forward to a business day, which counts as day 0.
+        """
+        start = self.next_business_day(d)
+        year = start.year
+        table = self.year_table(year)
+        index = table.ordinals[start] + count
+        while index >= len(table.days):
+            index -= len(table.days)
+            year += 1
+            table = self.year_table(year)
+        while index < 0:
+            year -= 1
+            table = self.year_table(year)
+            index += len(table.days)
+        return table.days[index]
+
+    def business_days(self, start: date, end: date):
+        """Business days from ``start`` to ``end`` inclusive."""
+        days = []
+        for year in range(start.year, end.year + 1):
+            days.extend(d for d in self.year_table(year).days if start <= d <= end)
+        return days
+
+
+_calendar = None
+
+
+def get_calendar() -> BusinessCalendar:
+    """
+    Shared calendar for this process.
+
+    The holiday set is rebuilt when the version stored in the cache moves on.
+    With a shared cache backend a change in one worker reaches all of them.
+    """
+    global _calendar
+    version = cache.get(CALENDAR_VERSION_KEY, 0)
+    if _calendar is None or _calendar.version != version:
+        from .models import PublicHoliday  # avoid circular import
+
+        holidays = PublicHoliday.objects.values_list("holiday_date", flat=True)
+        _calendar = BusinessCalendar(holidays, version)
+    return _calendar
+
+
+def _bump_version():
+    global _calendar
+    try:
+        cache.incr(CALENDAR_VERSION_KEY)
+    except ValueError:
+        cache.set(CALENDAR_VERSION_KEY, 1, None)
+    _calendar = None
+
+
+def invalidate_calendar(using=None, **kwargs):
+    """
+    Signal handler: drop cached holidays after a PublicHoliday change.
+
+    Deferred to the commit, so a reload in between cannot keep the old holidays.
+    """
+    transaction.on_commit(_bump_version, using=using)
@@ -0,0 +1,68 @@
+import asyncio
+from datetime import date
+
+from django.db.models import Exists, OuterRef
+
+from .models import Customer, Loan, Repayment
+from .schedule import with_schedule_state
+from .stats import astats_for, stats_for
+
+
+def _active_loans(agent_profile, day):
+    # Rows for the dashboard tables, with the customer joined in and the
+    # schedule state annotated so the template never has to query per row.
+    active_loans = Loan.objects.filter(customer__agent=agent_profile, status__in=Loan.OPEN_STATUSES)
+    return with_schedule_state(active_loans, day).select_related("customer").annotate(
+        paid_today=Exists(Repayment.objects.filter(loan=OuterRef("pk"), date=day))
+    )
+
+
+def _summary(stats, loans, total_customers):
+    # Due: an installment has fallen due and nothing was collected today
+    due_loans = [loan for loan in loans if loan.is_due_today]
+
+    return {
+        "loans": loans,
+        "due_loans": due_loans,
+        "stats": stats,
+        "total_customers": total_customers,
+        "active_loan_count": len(loans),
+        "total_due_loans": stats.loans_expected,
+        "amount_to_collect": stats.amount_expected,
+        "amount_collected": stats.amount_collected,
+        "loans_collected_count": stats.loans_collected,
+        "amount_collection_percentage": stats.amount_collection_percentage,
+        "loan_collection_percentage": stats.loan_collection_percentage,
+        # Daily performance: share of today's expected loans already collected
+        "performance": stats.loan_collection_percentage,
+    }
+
+
+def agent_collection_summary(agent_profile, day=None):
+    """
+    Collection metrics for an agent's active portfolio on ``day`` (default today).
+
+    The headline figures come from the agent's AgentDailyStats row, so the
+    number of queries stays the same whether the agent carries 3 loans or 300.
+    """
+    day = day or date.today()
+    return _summary(
+        stats_for(agent_profile, day),
+        list(_active_loans(agent_profile, day)),
+        Customer.objects.filter(agent=agent_profile).count(),
+    )
+
+
+async def aagent_collection_summary(agent_profile, day=None):
+    """Async ``agent_collection_summary``; its three queries are issued together."""
+    day = day or date.today()
+
+    async def loans():
+        return [loan async for loan in _active_loans(agent_profile, day)]
+
+    stats, loan_rows, total_customers = await asyncio.gather(
+        astats_for(agent_profile, day),
+        loans(),
+        Customer.objects.filter(agent=agent_profile).acount(),
+    )
+    return _summary(stats, loan_rows, total_customers)
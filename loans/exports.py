@@ -0,0 +1,158 @@
+import csv
+import zlib
+
+from .history import parse_day
+
+CHUNK_SIZE = 2000
+# Compress in blocks of about this many bytes rather than row by row
+GZIP_BLOCK = 64 * 1024
+
+
+def _repayments():
+    from .models import Repayment  # avoid circular import
+
+    return Repayment.objects.all(), {
+        "repayment_id": "id",
+        "date": "date",
+        "amount_paid": "amount_paid",
+        "loan_id": "loan_id",
+        "loan_status": "loan__status",
+        "customer_id": "loan__customer_id",
+        "customer": "loan__customer__name",
+        "national_id": "loan__customer__national_id",
+        "agent_id": "recorded_by_id",
+        "agent": "recorded_by__user__username",
+    }
+
+
+def _loans():
+    from .models import Loan
+
+    return Loan.objects.all(), {
+        "loan_id": "id",
+        "start_date": "start_date",
+        "end_date": "end_date",
+        "principal_amount": "principal_amount",
+        "interest_rate": "interest_rate",
+        "total_due": "total_due",
+        "daily_payment": "daily_payment",
+        "duration_days": "duration_days",
+        "total_paid": "total_paid",
+        "status": "status",
+        "customer_id": "customer_id",
+        "customer": "customer__name",
+        "national_id": "customer__national_id",
+        "agent_id": "customer__agent_id",
+        "agent": "customer__agent__user__username",
+    }
+
+
+def _customers():
+    from .models import Customer
+
+    return Customer.objects.all(), {
+        "customer_id": "id",
+        "created_at": "created_at",
+        "name": "name",
+        "phone": "phone",
+        "national_id": "national_id",
+        "location": "location",
+        "credit_score": "credit_score",
+        "has_active_loan": "has_active_loan",
+        "agent_id": "agent_id",
+        "agent": "agent__user__username",
+    }
+
+
+# kind -> (source, date field, agent field, status field)
+EXPORTS = {
+    "repayments": (_repayments, "date", "recorded_by_id", "loan__status"),
+    "loans": (_loans, "start_date", "customer__agent_id", "status"),
+    "customers": (_customers, "created_at", "agent_id", "has_active_loan"),
+}
+CUSTOMER_STATUSES = {"active": True, "inactive": False}
+
+
+def parse_filters(kind, start=None, end=None, agent=None, status=None):
+    """
+    Validate raw filter values (from a query string or the command line).
+
+    Returns a dict for ``export_rows``; raises ValueError with a message fit
+    to show the user.
+    """
+    if kind not in EXPORTS:
+        raise ValueError(f"Unknown export {kind!r}; choose one of {', '.join(EXPORTS)}.")
+    try:
+        filters = {"start": parse_day(start), "end": parse_day(end)}
+    except ValueError:
+        raise ValueError("start and end must be dates (YYYY-MM-DD).") from None
+    if agent:
+        try:
+            filters["agent"] = int(agent)
+        except ValueError:
+            raise ValueError("agent must be an agent id.") from None
+    if status:
+        if kind == "customers":
+            if status not in CUSTOMER_STATUSES:
+                raise ValueError("Customer status must be 'active' or 'inactive'.")
+            status = CUSTOMER_STATUSES[status]
+        filters["status"] = status
+    return filters
+
+
+def export_rows(kind, start=None, end=None, agent=None, status=None, chunk_size=CHUNK_SIZE):
+    """
+    Header, then one tuple per row of the ``kind`` export in id order.
+    Filters are as returned by ``parse_filters``.
+
+    Dates are inclusive. Rows are fetched ``chunk_size`` at a time through
+    ``iterator()`` (a server-side cursor on PostgreSQL), so memory stays flat
+    however many rows match.
+    """
+    source, date_field, agent_field, status_field = EXPORTS[kind]
+    queryset, columns = source()
+    if start:
+        queryset = queryset.filter(**{f"{date_field}__gte": start})
+    if end:
+        queryset = queryset.filter(**{f"{date_field}__lte": end})
+    if agent:
+        queryset = queryset.filter(**{agent_field: agent})
+    if status is not None:
+        queryset = queryset.filter(**{status_field: status})
+
+    yield list(columns)
+    yield from queryset.order_by("id").values_list(*columns.values()).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object for csv.writer that hands each line back instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_chunks(rows, compress=False):
+    """Encode ``rows`` as CSV bytes, gzip-compressed on the fly if ``compress``."""
+    writer = csv.writer(_Echo())
+    lines = (writer.writerow(row).encode() for row in rows)
+    if not compress:
+        yield from lines
+        return
+
+    gzip = zlib.compressobj(wbits=31)  # 31: gzip header and trailer
+    block = []
+    size = 0
+    for line in lines:
+        block.append(line)
+        size += len(line)
+        if size >= GZIP_BLOCK:
+            compressed = gzip.compress(b"".join(block))
+            if compressed:  # zlib may hold everything back until it has more
+                yield compressed
+            block, size = [], 0
+    yield gzip.compress(b"".join(block)) + gzip.flush()
+
+
+def export_filename(kind, filters, compress=False):
+    parts = [kind] + [filters[key].isoformat() for key in ("start", "end") if filters.get(key)]
+    return "-".join(parts) + (".csv.gz" if compress else ".csv")
@@ -0,0 +1,99 @@
+import hashlib
+from datetime import date
+
+from django.db.models import Count, Max
+from django.utils.http import quote_etag
+
+from .business_days import get_calendar
+
+
+def parse_day(value):
+    """
+    A date from ``YYYY-MM-DD``, or from an ISO datetime as FullCalendar sends;
+    None when blank. Raises ValueError otherwise.
+    """
+    if not value:
+        return None
+    return date.fromisoformat(value[:10])
+
+
+def feed_version(customer, today=None):
+    """
+    ``(etag, last_modified)`` for the customer's calendar feed.
+
+    The feed changes when one of the customer's loans or repayments does, when
+    the holidays change, and overnight as unpaid due days become missed ones.
+    """
+    from .models import Loan, Repayment  # avoid circular import
+
+    today = today or date.today()
+    loans = Loan.objects.filter(customer=customer).aggregate(count=Count("id"), changed=Max("updated_at"))
+    repayments = Repayment.objects.filter(loan__customer=customer).aggregate(
+        count=Count("id"), changed=Max("updated_at")
+    )
+    changed = [stamp for stamp in (loans["changed"], repayments["changed"]) if stamp]
+    last_modified = int(max(changed).timestamp()) if changed else None
+
+    # Counts catch deletions, which leave the latest updated_at unchanged
+    key = "|".join(str(part) for part in (
+        customer.pk, today, get_calendar().version,
+        loans["count"], loans["changed"], repayments["count"], repayments["changed"],
+    ))
+    return quote_etag(hashlib.md5(key.encode()).hexdigest()), last_modified
+
+
+def customer_events(customer, start=None, end=None, today=None):
+    """
+    Calendar events for all of the customer's loans with dates in ``[start, end)``.
+
+    Each loan's disbursement, its paid and missed installments, and public
+    holidays as background events. Two queries whatever the range.
+    """
+    from .models import Loan, LoanInstallment
+
+    today = today or date.today()
+    loans = Loan.objects.filter(customer=customer, start_date__isnull=False)
+    installments = LoanInstallment.objects.filter(loan__customer=customer)
+    if start:
+        loans = loans.filter(start_date__gte=start)
+        installments = installments.filter(due_date__gte=start)
+    if end:
+        loans = loans.filter(start_date__lt=end)
+        installments = installments.filter(due_date__lt=end)
+
+    events = [
+        {
+            "title": "Disbursed",
+            "start": start_date.isoformat(),
+            "color": "#2196F3",
+            "classNames": ["fc-event-loan-disbursed"],
+            "extendedProps": {"loan": loan_id},
+        }
+        for loan_id, start_date in loans.order_by("start_date").values_list("id", "start_date")
+    ]
+    for loan_id, due_date, paid_on in installments.order_by("due_date").values_list("loan_id", "due_date", "paid_on"):
+        if paid_on:
+            title, color = "Paid", "green"
+        elif due_date < today:
+            title, color = "Missed", "red"
+        else:
+            continue
+        events.append({
+            "title": title,
+            "start": due_date.isoformat(),
+            "color": color,
+            "classNames": [f"fc-event-loan-{title.lower()}"],
+            "extendedProps": {"loan": loan_id},
+        })
+
+    # Without a range, show the holidays that fall within the loans' dates
+    days = [event["start"] for event in events]
+    first = start or (date.fromisoformat(min(days)) if days else None)
+    last = end or (date.fromisoformat(max(days)) if days else None)
+    if first and last:
+        events.extend(
+            {"title": "Holiday", "start": day.isoformat(), "display": "background", "color": "#ffcc80"}
+            for day in sorted(get_calendar().holidays)
+            if first <= day and (day < last if end else day <= last)
+        )
+    return events
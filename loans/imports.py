@@ -0,0 +1,230 @@
+import csv
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+
+from .admin_totals import invalidate_totals
+from .business_days import get_calendar
+from .forms import CustomerImportForm, LoanForm
+from .history import parse_day
+from .pricing import get_catalog, price
+from .schedule import CENT, allocate_payment, build_installments, insert_installments
+from .stats import record_schedules
+
+CHUNK_SIZE = 1000
+REQUIRED_COLUMNS = ("name", "phone", "national_id")
+# Everything else is optional; a row without principal_amount creates only the customer
+OPTIONAL_COLUMNS = (
+    "location", "agent", "credit_score",
+    "product", "principal_amount", "interest_rate", "duration_days", "start_date", "amount_paid",
+)
+
+
+class ImportFileError(ValueError):
+    """The file as a whole can't be imported (as opposed to a bad row)."""
+
+
+def _clean(row):
+    return {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+
+
+class _Importer:
+    def __init__(self, agents, default_agent=None, dry_run=False):
+        self.agents = agents
+        self.default_agent = default_agent
+        self.dry_run = dry_run
+        self.catalog = get_catalog()
+        settings = self.catalog.settings
+        # Terms for rows that name neither a product nor their own rate and duration
+        self.defaults = {
+            "interest_rate": settings.interest_percent if settings else Decimal("20"),
+            "duration_days": settings.duration_days if settings else 20,
+        }
+        self.calendar = get_calendar()
+        self.first_start = self.calendar.next_business_day(date.today() + timedelta(days=1))
+        self.seen = {}  # national_id -> row number, across chunks
+        self.schedules = {}  # loan terms -> installment rows; imported loans mostly share terms
+        self.result = {"rows": 0, "customers": 0, "loans": 0, "errors": []}
+
+    def error(self, number, row, message):
+        self.result["errors"].append({"row": number, "national_id": row.get("national_id", ""), "error": message})
+
+    def parse(self, number, row):
+        """A ``(customer, loan or None, schedule)`` triple for a valid row, else None."""
+        form = CustomerImportForm(row)
+        if not form.is_valid():
+            self.error(number, row, "; ".join(
+                f"{field}: {' '.join(errors)}" for field, errors in form.errors.items()
+            ))
+            return None
+        customer = form.save(commit=False)
+
+        agent = self.agents.get(row.get("agent")) if row.get("agent") else self.default_agent
+        if agent is None:
+            self.error(number, row, f"Unknown agent {row['agent']!r}." if row.get("agent") else "No agent given.")
+            return None
+        customer.agent = agent
+        if row.get("credit_score"):
+            try:
+                customer.credit_score = int(row["credit_score"])
+            except ValueError:
+                self.error(number, row, "credit_score must be a whole number.")
+                return None
+        customer.normalize_search_fields()
+
+        if not row.get("principal_amount"):
+            return customer, None, []
+
+        product = None
+        if row.get("product"):
+            # A product's terms win over any rate or duration given in the row
+            product = self.catalog.by_name.get(row["product"])
+            if product is None:
+                self.error(number, row, f"Unknown or inactive product {row['product']!r}.")
+                return None
+            terms = {"interest_rate": product.interest_rate, "duration_days": product.duration_days}
+        else:
+            terms = {field: row.get(field) or default for field, default in self.defaults.items()}
+        loan_form = LoanForm({"principal_amount": row["principal_amount"], **terms})
+        if not loan_form.is_valid():
+            self.error(number, row, "; ".join(
+                f"{field}: {' '.join(errors)}" for field, errors in loan_form.errors.items()
+            ))
+            return None
+        loan = loan_form.save(commit=False)
+        try:
+            start = parse_day(row.get("start_date"))
+            amount_paid = Decimal(row.get("amount_paid") or "0").quantize(CENT)
+        except ValueError:
+            self.error(number, row, "start_date must be YYYY-MM-DD.")
+            return None
+        except ArithmeticError:
+            self.error(number, row, "amount_paid must be a number.")
+            return None
+        if loan.principal_amount <= 0 or loan.duration_days <= 0:
+            self.error(number, row, "principal_amount and duration_days must be positive.")
+            return None
+
+        # What Loan.save would work out, done here because bulk_create skips it
+        loan.customer = customer
+        loan.product = product
+        loan.total_due, loan.daily_payment, _ = price(loan.principal_amount, loan.interest_rate, loan.duration_days)
+        loan.start_date = self.calendar.next_business_day(start) if start else self.first_start
+        loan.end_date = loan.start_date + timedelta(days=loan.duration_days)
+        loan.status = "active"
+        if not amount_paid.is_finite() or not 0 <= amount_paid < loan.total_due:
+            self.error(number, row, f"amount_paid must be between 0 and the total due ({loan.total_due}).")
+            return None
+
+        schedule, days_paid, last_paid_date = self.schedule(loan, amount_paid)
+        loan.total_paid = amount_paid
+        loan.days_paid = days_paid
+        loan.last_paid_date = last_paid_date
+        customer.has_active_loan = True
+        return customer, loan, schedule
+
+    def schedule(self, loan, amount_paid):
+        """
+        ``(rows, days_paid, last_paid_date)`` for the loan, where rows are
+        ``(number, due_date, amount_due, amount_paid, paid_on)``.
+
+        An opening balance has no payment history, so ``amount_paid`` is
+        spread over the installments as if each was paid on its due date.
+        """
+        key = (loan.start_date, loan.duration_days, loan.total_due, loan.daily_payment, amount_paid)
+        if key not in self.schedules:
+            installments = build_installments(loan, self.calendar)
+            covered = [
+                installment for installment in allocate_payment(installments, amount_paid, None)
+                if installment.amount_paid >= installment.amount_due
+            ]
+            for installment in covered:
+                installment.paid_on = installment.due_date
+            self.schedules[key] = (
+                [(i.number, i.due_date, i.amount_due, i.amount_paid, i.paid_on) for i in installments],
+                len(covered),
+                covered[-1].due_date if covered else None,
+            )
+        return self.schedules[key]
+
+    def chunk(self, rows):
+        from .models import Customer, Loan
+
+        ids = [row.get("national_id", "") for _, row in rows]
+        existing = set(Customer.objects.filter(national_id__in=ids).values_list("national_id", flat=True))
+
+        parsed = []
+        for number, row in rows:
+            self.result["rows"] += 1
+            national_id = row.get("national_id", "")
+            if national_id in existing:
+                self.error(number, row, "A customer with this national_id already exists.")
+                continue
+            if national_id in self.seen:
+                self.error(number, row, f"national_id repeats row {self.seen[national_id]}.")
+                continue
+            entry = self.parse(number, row)
+            if entry:
+                self.seen[national_id] = number
+                parsed.append(entry)
+
+        self.result["customers"] += len(parsed)
+        self.result["loans"] += sum(1 for _, loan, _ in parsed if loan)
+        if self.dry_run or not parsed:
+            return
+        with transaction.atomic():
+            Customer.objects.bulk_create([customer for customer, _, _ in parsed])
+            # Loans pick up the customer ids just assigned
+            loans = [(loan, schedule) for _, loan, schedule in parsed if loan]
+            Loan.objects.bulk_create([loan for loan, _ in loans])
+            insert_installments([(loan.pk, *row) for loan, schedule in loans for row in schedule])
+            record_schedules(
+                (loan.customer.agent_id, [(due_date, amount_due) for _, due_date, amount_due, _, _ in schedule])
+                for loan, schedule in loans
+            )
+
+
+def import_customers(lines, default_agent=None, chunk_size=CHUNK_SIZE, dry_run=False):
+    """
+    Create customers, and optionally an opening loan each, from CSV ``lines``.
+
+    ``lines`` is any iterable of text lines (an open file, a decoded upload);
+    it is read ``chunk_size`` rows at a time, so memory does not grow with the
+    file. Each row is checked with CustomerForm and LoanForm rules; national_id
+    is checked against the database with one query per chunk and against
+    earlier rows. Good rows are written with bulk_create, one transaction per
+    chunk; bad rows are skipped and reported.
+
+    Imported loans are opening balances carried over from elsewhere, so no
+    cash leaves the agent's hand: there is no disbursement ledger entry.
+    ``amount_paid`` is spread over the installments as if paid on time.
+
+    Returns ``{"rows", "customers", "loans", "errors": [{"row", "national_id", "error"}]}``;
+    with ``dry_run`` nothing is written but the counts and errors are the same.
+    """
+    from accounts.models import AgentProfile
+
+    reader = csv.DictReader(lines)
+    header = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}.")
+
+    agents = {}
+    if "agent" in header:
+        agents = {profile.user.username: profile for profile in AgentProfile.objects.select_related("user")}
+    importer = _Importer(agents, default_agent, dry_run)
+
+    rows = []
+    for number, row in enumerate(reader, start=2):  # line 1 is the header
+        rows.append((number, _clean(row)))
+        if len(rows) >= chunk_size:
+            importer.chunk(rows)
+            rows = []
+    if rows:
+        importer.chunk(rows)
+
+    if importer.result["customers"] and not dry_run:
+        invalidate_totals()
+    return importer.result
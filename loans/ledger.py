@@ -0,0 +1,98 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.utils import timezone
+
+from accounts.models import AgentProfile
+
+
+def _move_balance(agent_id, amount, now):
+    # The UPDATE comes before the ledger INSERT so the agent row stays locked
+    # while the entry is uncommitted; checkpoint() relies on that.
+    AgentProfile.objects.filter(pk=agent_id).update(amount_in_hand=F("amount_in_hand") + amount, updated_at=now)
+
+
+def post_entry(agent, amount, kind, loan=None, repayment=None, transaction_request=None):
+    """
+    Append a cash movement for ``agent`` (positive in, negative out) and apply it
+    to ``amount_in_hand`` with an F() increment, in one transaction.
+    """
+    from .models import CashLedgerEntry  # avoid circular import
+
+    with transaction.atomic():
+        _move_balance(agent.pk, amount, timezone.now())
+        return CashLedgerEntry.objects.create(
+            agent=agent,
+            amount=amount,
+            kind=kind,
+            loan=loan,
+            repayment=repayment,
+            transaction_request=transaction_request,
+        )
+
+
+def post_entries(entries):
+    """Append unsaved CashLedgerEntry rows with one balance UPDATE per agent."""
+    from .models import CashLedgerEntry
+
+    totals = defaultdict(Decimal)
+    for entry in entries:
+        totals[entry.agent_id] += entry.amount
+    now = timezone.now()
+    with transaction.atomic():
+        for agent_id in sorted(totals):
+            _move_balance(agent_id, totals[agent_id], now)
+        return CashLedgerEntry.objects.bulk_create(entries, batch_size=500)
+
+
+def ledger_balance(agent, full=False):
+    """
+    The agent's balance according to the ledger: the latest checkpoint plus the
+    entries after it, so the cost grows only with entries since the checkpoint.
+    ``full`` ignores checkpoints and sums every entry.
+    """
+    from .models import CashCheckpoint, CashLedgerEntry
+
+    checkpoint = None if full else CashCheckpoint.objects.filter(agent=agent).order_by("-last_entry_id").first()
+    entries = CashLedgerEntry.objects.filter(agent=agent)
+    balance = Decimal("0")
+    if checkpoint:
+        entries = entries.filter(id__gt=checkpoint.last_entry_id)
+        balance = checkpoint.balance
+    return balance + (entries.aggregate(total=Sum("amount"))["total"] or Decimal("0"))
+
+
+def checkpoint(agent):
+    """
+    Record the agent's current ledger balance as a checkpoint.
+
+    Locking the agent row waits out in-flight postings (each one updates that row
+    before inserting its entry), so no entry below the checkpoint can appear later.
+    """
+    from .models import CashCheckpoint, CashLedgerEntry
+
+    with transaction.atomic():
+        AgentProfile.objects.select_for_update().filter(pk=agent.pk).first()
+        last_entry_id = CashLedgerEntry.objects.filter(agent=agent).aggregate(last=Max("id"))["last"]
+        if last_entry_id is None:
+            return None
+        latest = CashCheckpoint.objects.filter(agent=agent).order_by("-last_entry_id").first()
+        if latest and latest.last_entry_id == last_entry_id:
+            return latest
+        return CashCheckpoint.objects.create(agent=agent, last_entry_id=last_entry_id, balance=ledger_balance(agent))
+
+
+def reconcile(agents=None, full=False):
+    """Return ``(agent, stored_balance, ledger_balance)`` for every agent whose two figures differ."""
+    agents = agents if agents is not None else AgentProfile.objects.select_related("user").order_by("id")
+    mismatches = []
+    for agent in agents:
+        with transaction.atomic():
+            # Read both figures under the row lock so a posting can't land in between
+            stored = AgentProfile.objects.select_for_update().values_list("amount_in_hand", flat=True).get(pk=agent.pk)
+            expected = ledger_balance(agent, full=full)
+        if stored != expected:
+            mismatches.append((agent, stored, expected))
+    return mismatches
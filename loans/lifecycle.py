@@ -0,0 +1,129 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db.models import Exists, F, Max, OuterRef
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .admin_totals import invalidate_totals
+from .scoring import LATE_INSTALLMENTS, get_rules
+from .stats import release_schedule
+
+# Days past the final installment before an overdue loan counts as defaulted
+DEFAULT_AFTER_DAYS = getattr(settings, "LOAN_DEFAULT_AFTER_DAYS", 30)
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def chunks(queryset, after=0, size=DEFAULT_CHUNK_SIZE):
+    """Yield lists of rows in id order, resuming after ``after``; each chunk is one query."""
+    while True:
+        chunk = list(queryset.filter(id__gt=after).order_by("id")[:size])
+        if not chunk:
+            return
+        yield chunk
+        after = chunk[-1].id
+
+
+def status_for(loan, today):
+    """The status ``loan`` should have on ``today``; needs the ``final_due`` annotation."""
+    if loan.total_paid >= loan.total_due:
+        return "completed"
+    if loan.final_due and loan.final_due < today - timedelta(days=DEFAULT_AFTER_DAYS):
+        return "defaulted"
+    if loan.final_due and loan.final_due < today:
+        return "overdue"
+    return loan.status
+
+
+def open_loans():
+    """Open loans with ``final_due``: the last installment's due date, or end_date without a schedule."""
+    from .models import Loan  # avoid circular import
+
+    return Loan.objects.filter(status__in=Loan.OPEN_STATUSES).annotate(
+        final_due=Coalesce(Max("installments__due_date"), F("end_date"))
+    ).select_related("customer")
+
+
+def sweep_statuses(loans, today=None, dry_run=False):
+    """
+    Move each open loan in ``loans`` to the status it has drifted into.
+
+    Returns ``{status: count}`` of the changes made (or that would be made).
+    """
+    from .models import Loan
+
+    today = today or date.today()
+    now = timezone.now()
+    changed, counts = [], {}
+    for loan in loans:
+        status = status_for(loan, today)
+        if status == loan.status:
+            continue
+        counts[status] = counts.get(status, 0) + 1
+        if dry_run:
+            continue
+        if status == "completed":
+            # Paid off without record_payment noticing; stop expecting collections
+            release_schedule(loan, loan.last_paid_date or today)
+        loan.status = status
+        loan.updated_at = now
+        changed.append(loan)
+    if changed:
+        Loan.objects.bulk_update(changed, ["status", "updated_at"])
+        invalidate_totals()
+    return counts
+
+
+def unscored_loans():
+    """
+    Completed loans whose customer score has not been updated yet.
+
+    ``installments_late`` counts installments paid after their due date:
+    once a loan is fully paid that is the only way it can have missed days.
+    """
+    from .models import Loan
+
+    return Loan.objects.filter(status="completed", credit_scored=False).annotate(
+        installments_late=LATE_INSTALLMENTS
+    ).select_related("customer")
+
+
+def score_loans(loans, dry_run=False):
+    """Apply ``Customer.update_credit_score`` for each loan; returns the number scored."""
+    from .models import Customer, Loan
+
+    now = timezone.now()
+    rules = get_rules()
+    customers = {}
+    for loan in loans:
+        # Loans of one customer share a Customer object so their updates stack
+        customer = customers.setdefault(loan.customer_id, loan.customer)
+        customer.update_credit_score(loan, commit=False, rules=rules)
+        loan.credit_scored = True
+        loan.updated_at = now
+    if not dry_run and loans:
+        for customer in customers.values():
+            customer.updated_at = now
+        Customer.objects.bulk_update(customers.values(), ["credit_score", "updated_at"])
+        Loan.objects.bulk_update(loans, ["credit_scored", "updated_at"])
+    return len(loans)
+
+
+def reconcile_active_flags(dry_run=False):
+    """
+    Set ``Customer.has_active_loan`` from whether the customer has an open loan.
+
+    Two set-based UPDATEs; returns ``(flags_set, flags_cleared)``.
+    """
+    from .models import Customer, Loan
+
+    has_open = Exists(Loan.objects.filter(customer=OuterRef("pk"), status__in=Loan.OPEN_STATUSES))
+    to_set = Customer.objects.filter(has_active_loan=False).filter(has_open)
+    to_clear = Customer.objects.filter(has_active_loan=True).exclude(has_open)
+    if dry_run:
+        return to_set.count(), to_clear.count()
+    now = timezone.now()
+    return (
+        to_set.update(has_active_loan=True, updated_at=now),
+        to_clear.update(has_active_loan=False, updated_at=now),
+    )
@@ -0,0 +1,46 @@
+import io
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from .benchmark_connections import gunicorn_server
+
+
+class Command(BaseCommand):
+    help = (
+        "Run loadtest's mixed workload against the site served over WSGI (gunicorn threads) "
+        "and over ASGI (uvicorn workers, async dashboard views), with the same number of "
+        "worker processes, and print both. Uses the users created by generate_synthetic_data "
+        "with the same --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes.")
+        parser.add_argument("--threads", type=int, default=4, help="Threads per WSGI worker.")
+        parser.add_argument("--seed", type=int, default=1, help="Seed given to generate_synthetic_data.")
+        parser.add_argument("--password", default="synthetic")
+        parser.add_argument("--concurrency", type=int, default=20, help="Simultaneous clients.")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per server.")
+
+    def handle(self, *args, **options):
+        workers = ["--workers", str(options["workers"])]
+        profiles = (
+            ("wsgi", "microfinance.wsgi", workers + ["--threads", str(options["threads"])]),
+            ("asgi", "microfinance.asgi", workers + ["--worker-class", "uvicorn_worker.UvicornWorker"]),
+        )
+        for name, app, args in profiles:
+            with gunicorn_server(app, options["port"], args, label=name) as base_url:
+                output = io.StringIO()
+                call_command(
+                    "loadtest",
+                    base_url=base_url,
+                    seed=options["seed"],
+                    password=options["password"],
+                    concurrency=options["concurrency"],
+                    requests=options["requests"],
+                    stdout=output,
+                )
+            self.stdout.write(self.style.SUCCESS(f"{name}: {' '.join(args)} on {connection.vendor}"))
+            self.stdout.write(output.getvalue())
@@ -0,0 +1,102 @@
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+MODES = ("fresh", "persistent", "pool")
+
+
+def wait_for_port(port, process, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+@contextmanager
+def gunicorn_server(app, port, args=(), env=None, label=""):
+    """Run gunicorn serving ``app`` on ``port`` for the duration of the block."""
+    with tempfile.TemporaryFile() as log:
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", app, "--bind", f"127.0.0.1:{port}", *args],
+            cwd=settings.BASE_DIR,
+            env={**os.environ, **(env or {})},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+        try:
+            if not wait_for_port(port, server, timeout=30):
+                log.seek(0)
+                raise CommandError(
+                    f"gunicorn did not start ({label or app}):\n" + log.read().decode(errors="replace")[-2000:]
+                )
+            yield f"http://127.0.0.1:{port}"
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+class Command(BaseCommand):
+    help = (
+        "Start gunicorn once per DB_CONN_MODE and run loadtest against each, to compare "
+        "request latency with fresh, persistent and pooled database connections. Uses the "
+        "users created by generate_synthetic_data with the same --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--modes", default=",".join(MODES), help="Comma-separated DB_CONN_MODE values to compare."
+        )
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes.")
+        parser.add_argument("--threads", type=int, default=4, help="Threads per worker.")
+        parser.add_argument("--seed", type=int, default=1, help="Seed given to generate_synthetic_data.")
+        parser.add_argument("--password", default="synthetic")
+        parser.add_argument("--concurrency", type=int, default=10, help="Simultaneous clients.")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per mode.")
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options["modes"].split(",") if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown mode(s) {', '.join(sorted(unknown))}; choose from {', '.join(MODES)}.")
+
+        for mode in modes:
+            if mode == "pool" and connection.vendor != "postgresql":
+                self.stdout.write(self.style.WARNING(f"{mode}: skipped, pooling needs PostgreSQL"))
+                continue
+
+            args = ["--workers", str(options["workers"]), "--threads", str(options["threads"])]
+            with gunicorn_server(
+                "microfinance.wsgi", options["port"], args, env={"DB_CONN_MODE": mode}, label=f"{mode} mode"
+            ) as base_url:
+                output = io.StringIO()
+                call_command(
+                    "loadtest",
+                    base_url=base_url,
+                    seed=options["seed"],
+                    password=options["password"],
+                    concurrency=options["concurrency"],
+                    requests=options["requests"],
+                    stdout=output,
+                )
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{mode}: {options['workers']} workers x {options['threads']} threads on {connection.vendor}"
+            ))
+            self.stdout.write(output.getvalue())
@@ -0,0 +1,114 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Index, Sum
+
+from accounts.models import AgentProfile
+from loans.models import AdminTransactionRequest, Customer, Loan, Repayment
+
+# The access-path indexes added in migration 0026, by model
+INDEXES = {
+    Loan: ["loans_loan_status_idx", "loans_loan_open_idx"],
+    Repayment: ["loans_repayment_agent_date_idx", "loans_repayment_date_idx"],
+    AdminTransactionRequest: ["loans_txrequest_pending_idx"],
+}
+
+
+def hot_queries(agent, customer, day):
+    """``(label, queryset)`` for the queries the indexes are meant for, as the app runs them."""
+    return [
+        ("agent dashboard: open loans", Loan.objects.filter(
+            customer__agent=agent, status__in=Loan.OPEN_STATUSES
+        ).values_list("id", flat=True)),
+        ("customer has an open loan", Loan.objects.filter(
+            customer=customer, status__in=Loan.OPEN_STATUSES
+        ).values_list("id", flat=True)[:1]),
+        ("active loan count", Loan.objects.filter(status__in=Loan.OPEN_STATUSES).values("status").annotate(
+            count=Count("id")
+        ).order_by()),
+        ("loans awaiting scoring", Loan.objects.filter(
+            status="completed", credit_scored=False
+        ).values_list("customer_id", flat=True)),
+        ("agent collections, 30 days", Repayment.objects.filter(
+            recorded_by=agent, date__range=(day - timedelta(days=30), day)
+        ).values("recorded_by").annotate(total=Sum("amount_paid")).order_by()),
+        ("repayments on one day", Repayment.objects.filter(date=day).values("date").annotate(
+            count=Count("id"), total=Sum("amount_paid")
+        ).order_by()),
+        ("pending cash requests", AdminTransactionRequest.objects.filter(
+            status="pending"
+        ).order_by("created_at").values_list("id", flat=True)),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Print EXPLAIN plans and timings of the hot loan, repayment and cash-request queries "
+        "with and without the indexes from migration 0026. The indexes are dropped inside a "
+        "transaction that is rolled back, which locks those tables meanwhile: run it against a "
+        "copy, seeded with e.g. generate_synthetic_data --agents 50 --customers 400."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query; the median is reported.")
+        parser.add_argument("--plans", action="store_true", help="Print the query plans as well as timings.")
+
+    def handle(self, *args, **options):
+        agent = AgentProfile.objects.annotate(customers=Count("customer")).order_by("-customers").first()
+        day = Repayment.objects.order_by("-date").values_list("date", flat=True).first()
+        if agent is None or day is None:
+            raise CommandError("Nothing to measure; seed some data first (manage.py generate_synthetic_data).")
+        customer = Customer.objects.filter(agent=agent).order_by("id").first()
+        queries = hot_queries(agent, customer, day)
+
+        self.stdout.write(
+            f"{connection.vendor}: {Customer.objects.count()} customers, {Loan.objects.count()} loans, "
+            f"{Repayment.objects.count()} repayments, {AdminTransactionRequest.objects.count()} cash requests"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")  # fresh planner statistics on both backends
+
+        after = self.measure(queries, options["repeat"])
+        with transaction.atomic():
+            self.drop_indexes()
+            before = self.measure(queries, options["repeat"])
+            transaction.set_rollback(True)
+
+        for label, _ in queries:
+            (before_ms, before_plan), (after_ms, after_plan) = before[label], after[label]
+            self.stdout.write(
+                f"{label:<30} {before_ms:9.2f} ms -> {after_ms:9.2f} ms"
+                f"  ({before_ms / after_ms if after_ms else 0:.1f}x)"
+            )
+            if options["plans"]:
+                self.stdout.write(self.style.WARNING("  without:"))
+                self.stdout.write("    " + before_plan.replace("\n", "\n    "))
+                self.stdout.write(self.style.SUCCESS("  with:"))
+                self.stdout.write("    " + after_plan.replace("\n", "\n    "))
+
+    def measure(self, queries, repeat):
+        """``{label: (median ms, plan)}``."""
+        results = {}
+        for label, queryset in queries:
+            timings = []
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                list(queryset.all())  # a fresh clone each time, so nothing is cached
+                timings.append((time.perf_counter() - started) * 1000)
+            results[label] = (statistics.median(timings), queryset.explain())
+        return results
+
+    def drop_indexes(self):
+        """Put the tables back as they were before 0026, inside the caller's transaction."""
+        statements = [
+            f"DROP INDEX {connection.ops.quote_name(name)}" for names in INDEXES.values() for name in names
+        ]
+        # 0026 also dropped the foreign key's own index on recorded_by
+        recorded_by = Index(fields=["recorded_by"], name="loans_repayment_recorded_by_bench")
+        statements.append(str(recorded_by.create_sql(Repayment, connection.schema_editor())))
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
@@ -0,0 +1,131 @@
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+
+from accounts.models import AgentProfile
+from loans.ledger import ledger_balance
+from loans.models import AgentDailyStats, CashLedgerEntry, Customer, Loan, Repayment
+from loans.payments import PaymentError, record_payment
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one loan and one agent with concurrent record_payment calls, check that no "
+        "update was lost and report throughput. Creates its own agent, customer and loan "
+        "and removes them afterwards; do not run against production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--payments", type=int, default=25, help="Payments attempted per thread.")
+        parser.add_argument(
+            "--overlap",
+            type=int,
+            default=2,
+            help="Threads that try each payment day, so duplicate-day submits race too.",
+        )
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark rows for inspection.")
+
+    def handle(self, *args, **options):
+        threads, per_thread, overlap = options["threads"], options["payments"], max(1, options["overlap"])
+        days_needed = threads * per_thread // overlap + per_thread
+        suffix = uuid.uuid4().hex[:8]
+
+        user = User.objects.create_user(f"bench-{suffix}")
+        agent = AgentProfile.objects.get(user=user)
+        customer = Customer.objects.create(agent=agent, name=f"Benchmark {suffix}", phone="0", national_id=f"bench-{suffix}")
+        loan = Loan.objects.create(
+            customer=customer,
+            principal_amount=Decimal("1000000"),
+            duration_days=days_needed + 10,
+            start_date=date.today() - timedelta(days=days_needed + 10),
+        )
+        amount = Decimal("1.00")
+
+        # Thread t pays on days t//overlap*per_thread ... so `overlap` threads share each day
+        first_day = loan.start_date
+        outcomes = {"recorded": 0, "duplicate": 0, "error": 0}
+        latencies, lock = [], threading.Lock()
+        errors = []
+        barrier = threading.Barrier(threads)
+
+        def worker(number):
+            base = (number // overlap) * per_thread
+            try:
+                barrier.wait()
+                for offset in range(per_thread):
+                    day = first_day + timedelta(days=base + offset)
+                    started = time.perf_counter()
+                    try:
+                        record_payment(loan, agent, amount, day)
+                        outcome = "recorded"
+                    except PaymentError:
+                        outcome = "duplicate"
+                    except OperationalError as exc:  # e.g. SQLite "database is locked"
+                        outcome = "error"
+                        errors.append(str(exc))
+                    with lock:
+                        outcomes[outcome] += 1
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        pool = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        try:
+            failures = self.verify(loan, agent, amount, outcomes["recorded"])
+        finally:
+            if not options["keep"]:
+                CashLedgerEntry.objects.filter(agent=agent).delete()
+                user.delete()
+
+        latencies.sort()
+        attempts = sum(outcomes.values())
+        self.stdout.write(f"{connection.vendor}: {threads} threads x {per_thread} payments, {overlap} per day")
+        self.stdout.write(
+            f"{outcomes['recorded']} recorded, {outcomes['duplicate']} duplicate-day rejections, "
+            f"{outcomes['error']} database errors in {elapsed:.2f}s"
+        )
+        if latencies:
+            self.stdout.write(
+                f"{attempts / elapsed:.1f} attempts/s; latency p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+                f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms"
+            )
+        for message in sorted(set(errors))[:5]:
+            self.stdout.write(self.style.WARNING(f"  {message}"))
+        if failures:
+            raise CommandError("Lost updates detected:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("No lost updates: loan, installments, cash and stats all agree."))
+
+    def verify(self, loan, agent, amount, recorded):
+        loan.refresh_from_db()
+        agent.refresh_from_db()
+        repayments = Repayment.objects.filter(loan=loan)
+        paid = repayments.aggregate(total=Sum("amount_paid"))["total"] or Decimal("0")
+        installments = loan.installments.aggregate(total=Sum("amount_paid"))["total"] or Decimal("0")
+        collected = AgentDailyStats.objects.filter(agent=agent).aggregate(total=Sum("amount_collected"))["total"] or 0
+
+        checks = [
+            ("repayment rows", repayments.count(), recorded),
+            ("loan.total_paid", loan.total_paid, paid),
+            ("loan.days_paid", loan.days_paid, repayments.count()),
+            ("installment amount_paid", installments, paid),
+            ("agent.amount_in_hand", agent.amount_in_hand, paid),
+            ("cash ledger", ledger_balance(agent), paid),
+            ("daily stats collected", collected, paid),
+            ("expected total", paid, amount * recorded),
+        ]
+        return [f"{name}: {actual} != {expected}" for name, actual, expected in checks if actual != expected]
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loans.exports import CHUNK_SIZE, EXPORTS, csv_chunks, export_rows, parse_filters
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream repayments, loans or customers as CSV to a file or stdout, "
+        "filtered like the admin export page."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=list(EXPORTS))
+        parser.add_argument("--start", help="First date to include (YYYY-MM-DD).")
+        parser.add_argument("--end", help="Last date to include (YYYY-MM-DD).")
+        parser.add_argument("--agent", help="Agent id.")
+        parser.add_argument(
+            "--status",
+            help="Loan status (repayments, loans) or active/inactive (customers).",
+        )
+        parser.add_argument("--gzip", action="store_true", help="Compress the output.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows fetched per round trip.")
+        parser.add_argument("-o", "--output", help="File to write (default stdout).")
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(
+                options["kind"], options["start"], options["end"], options["agent"], options["status"]
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        chunks = csv_chunks(
+            export_rows(options["kind"], chunk_size=options["chunk_size"], **filters),
+            compress=options["gzip"],
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                output.writelines(chunks)
+        else:
+            sys.stdout.buffer.writelines(chunks)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,58 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import AgentProfile
+from loans.imports import CHUNK_SIZE, ImportFileError, import_customers
+
+
+class Command(BaseCommand):
+    help = (
+        "Import customers, each with an optional opening loan, from a CSV file. "
+        "Bad rows are skipped and reported; the rest are written in chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file with a header row.")
+        parser.add_argument("--agent", help="Username of the agent for rows without an agent column.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows per transaction.")
+        parser.add_argument("--errors", help="Write the rejected rows report to this CSV file.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate only; write nothing.")
+
+    def handle(self, *args, **options):
+        default_agent = None
+        if options["agent"]:
+            default_agent = AgentProfile.objects.filter(user__username=options["agent"]).first()
+            if default_agent is None:
+                raise CommandError(f"No agent called {options['agent']!r}.")
+
+        started = time.perf_counter()
+        try:
+            with open(options["path"], encoding="utf-8-sig", newline="") as lines:
+                result = import_customers(
+                    lines, default_agent=default_agent, chunk_size=options["chunk_size"], dry_run=options["dry_run"],
+                )
+        except (OSError, ImportFileError, UnicodeDecodeError, csv.Error) as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - started
+
+        if options["errors"]:
+            with open(options["errors"], "w", newline="") as output:
+                writer = csv.DictWriter(output, fieldnames=["row", "national_id", "error"])
+                writer.writeheader()
+                writer.writerows(result["errors"])
+        else:
+            for error in result["errors"][:20]:
+                self.stdout.write(f"  row {error['row']} ({error['national_id']}): {error['error']}")
+            if len(result["errors"]) > 20:
+                self.stdout.write(f"  ... and {len(result['errors']) - 20} more; use --errors for the full report.")
+
+        self.stdout.write(
+            f"{result['rows']} row(s) in {elapsed:.1f}s: {result['customers']} customer(s), "
+            f"{result['loans']} loan(s), {len(result['errors'])} rejected."
+        )
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING("Dry run; nothing was written."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Import complete."))
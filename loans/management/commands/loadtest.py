@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, Request, build_opener
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from accounts.models import AgentProfile
+from loans.models import Loan
+from loans.synthetic import usernames
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    # Time each view on its own; a 302 is its answer, not a hop to follow
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Session:
+    """A logged-in browser: cookie jar plus CSRF token."""
+
+    def __init__(self, base_url, username, password, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.cookies = CookieJar()
+        self.opener = build_opener(HTTPCookieProcessor(self.cookies), _NoRedirect)
+        self.timeout = timeout
+        login = reverse("login")
+        self.request("GET", login)
+        status = self.request("POST", login, {"username": username, "password": password})
+        if status != 302:
+            raise CommandError(f"Could not log in as {username} (HTTP {status}).")
+
+    def csrf_token(self):
+        return next((cookie.value for cookie in self.cookies if cookie.name == "csrftoken"), "")
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        body = None
+        headers = {"Referer": url}
+        if method == "POST":
+            body = urlencode({**(data or {}), "csrfmiddlewaretoken": self.csrf_token()}).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        try:
+            with self.opener.open(Request(url, data=body, headers=headers, method=method), timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except HTTPError as exc:
+            exc.read()
+            return exc.code
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the main loans pages concurrently against a running server and report "
+        "p50/p95/p99 latency and requests per second. Uses the users created by "
+        "generate_synthetic_data with the same --seed."
+    )
+
+    # (name, weight): the rough mix of a working day
+    SCENARIOS = (
+        ("dashboard", 35),
+        ("customer_history", 20),
+        ("mark_payment", 20),
+        ("customer_list", 10),
+        ("admin_dashboard", 5),
+        ("admin_customers", 5),
+        ("admin_par_report", 5),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+        parser.add_argument("--seed", type=int, default=1, help="Seed given to generate_synthetic_data.")
+        parser.add_argument("--password", default="synthetic")
+        parser.add_argument("--concurrency", type=int, default=10, help="Simultaneous clients.")
+        parser.add_argument("--requests", type=int, default=500, help="Total requests to send.")
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def handle(self, *args, **options):
+        agent_prefix, admin_username = usernames(options["seed"])
+        agents = list(AgentProfile.objects.filter(user__username__startswith=agent_prefix).select_related("user"))
+        if not agents:
+            raise CommandError(f"No {agent_prefix}* users; run generate_synthetic_data --seed {options['seed']} first.")
+
+        # What each agent can act on, read once up front
+        targets = {}
+        for agent in agents:
+            loans = list(
+                Loan.objects.filter(customer__agent=agent, status__in=Loan.OPEN_STATUSES).values_list("id", "customer_id")
+            )
+            targets[agent.user.username] = loans or [(None, None)]
+
+        base_url, password, timeout = options["base_url"], options["password"], options["timeout"]
+        local = threading.local()
+        names = [name for name, _ in self.SCENARIOS]
+        weights = [weight for _, weight in self.SCENARIOS]
+        rng = random.Random(options["seed"])
+        plan = rng.choices(names, weights=weights, k=options["requests"])
+
+        def session(admin):
+            key = "admin" if admin else "agent"
+            if not hasattr(local, key):
+                username = admin_username if admin else rng.choice(list(targets))
+                setattr(local, key, (username, Session(base_url, username, password, timeout)))
+            return getattr(local, key)
+
+        def run(name):
+            admin = name.startswith("admin")
+            username, client = session(admin)
+            loan_id, customer_id = random.choice(targets.get(username, [(None, None)]))
+            if name == "dashboard":
+                method, path, data = "GET", reverse("loans:agent_dashboard"), None
+            elif name == "customer_list":
+                method, path, data = "GET", reverse("loans:list_customers"), None
+            elif name == "customer_history" and customer_id:
+                method, path, data = "GET", reverse("loans:customer_history", args=[customer_id]), None
+            elif name == "mark_payment" and loan_id:
+                method, path, data = "POST", reverse("loans:mark_payment", args=[loan_id]), {}
+            elif admin:
+                method, path, data = "GET", reverse(f"loans:{name}"), None
+            else:
+                method, path, data = "GET", reverse("loans:agent_dashboard"), None
+            started = time.perf_counter()
+            try:
+                status = client.request(method, path, data)
+            except (URLError, OSError) as exc:
+                status = type(exc).__name__
+            return name, status, time.perf_counter() - started
+
+        try:
+            session(admin=False)  # fail fast on a wrong URL or password
+        except URLError as exc:
+            raise CommandError(f"Cannot reach {base_url}: {exc.reason}")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(run, plan))
+        elapsed = time.perf_counter() - started
+
+        by_name = defaultdict(list)
+        failures = defaultdict(int)
+        for name, status, seconds in results:
+            by_name[name].append(seconds)
+            by_name["all"].append(seconds)
+            if not (isinstance(status, int) and status < 400):
+                failures[name] += 1
+                failures["all"] += 1
+
+        self.stdout.write(
+            f"{len(results)} requests, {options['concurrency']} clients, {elapsed:.1f}s: "
+            f"{len(results) / elapsed:.1f} req/s"
+        )
+        self.stdout.write(f"{'scenario':<18}{'count':>7}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+        for name in names + ["all"]:
+            timings = sorted(by_name.get(name, []))
+            if not timings:
+                continue
+            self.stdout.write(
+                f"{name:<18}{len(timings):>7}{failures[name]:>8}"
+                f"{percentile(timings, 0.50) * 1000:>9.1f}{percentile(timings, 0.95) * 1000:>9.1f}"
+                f"{percentile(timings, 0.99) * 1000:>9.1f}"
+            )
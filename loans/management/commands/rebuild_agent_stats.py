@@ -0,0 +1,33 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loans.stats import rebuild_stats, verify_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or verify) the AgentDailyStats rollup from Repayment and LoanInstallment rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="First day to process (YYYY-MM-DD).")
+        parser.add_argument("--end", type=date.fromisoformat, help="Last day to process (YYYY-MM-DD).")
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare the stored counters with the source tables; change nothing.",
+        )
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+
+        if options["verify"]:
+            mismatches = verify_stats(start, end)
+            for agent_id, day, field, stored, expected in mismatches:
+                self.stdout.write(f"agent {agent_id} {day} {field}: stored {stored}, expected {expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} counter(s) out of step; run without --verify to rebuild.")
+            self.stdout.write(self.style.SUCCESS("AgentDailyStats matches the source tables."))
+            return
+
+        rows = rebuild_stats(start, end)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} agent-day row(s)."))
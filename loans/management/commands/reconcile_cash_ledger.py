@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import AgentProfile
+from loans.ledger import checkpoint, reconcile
+
+
+class Command(BaseCommand):
+    help = "Check every agent's amount_in_hand against their cash ledger, optionally writing checkpoints."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Sum every ledger entry instead of starting from the latest checkpoint (also verifies checkpoints).",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            action="store_true",
+            help="After a clean reconciliation, checkpoint each agent's balance.",
+        )
+
+    def handle(self, *args, **options):
+        agents = AgentProfile.objects.select_related("user").order_by("id")
+        mismatches = reconcile(agents, full=options["full"])
+        for agent, stored, expected in mismatches:
+            self.stdout.write(f"{agent}: amount_in_hand {stored}, ledger {expected}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} agent balance(s) disagree with the ledger.")
+        self.stdout.write(self.style.SUCCESS(f"{agents.count()} agent balance(s) match the ledger."))
+
+        if options["checkpoint"]:
+            written = sum(1 for agent in agents if checkpoint(agent))
+            self.stdout.write(self.style.SUCCESS(f"Checkpointed {written} agent(s)."))
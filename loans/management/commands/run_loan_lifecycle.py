@@ -0,0 +1,89 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from loans.lifecycle import (
+    DEFAULT_CHUNK_SIZE, chunks, open_loans, reconcile_active_flags, score_loans, sweep_statuses, unscored_loans,
+)
+from loans.models import JobCheckpoint
+
+JOB = "loan_lifecycle"
+PHASES = ("statuses", "scores", "flags")
+
+
+class Command(BaseCommand):
+    help = (
+        "Nightly loan sweep: mark loans overdue/defaulted/completed, update credit scores "
+        "for newly completed loans and reconcile Customer.has_active_loan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Loans per transaction.")
+        parser.add_argument("--date", type=date.fromisoformat, help="Business day to evaluate (default today).")
+        parser.add_argument("--dry-run", action="store_true", help="Report what would change; write nothing.")
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint left by an interrupted run and start from the beginning.",
+        )
+
+    def handle(self, *args, **options):
+        today = options["date"] or date.today()
+        size, dry_run = options["chunk_size"], options["dry_run"]
+
+        checkpoint = JobCheckpoint.objects.filter(job=JOB).first()
+        if checkpoint and (options["restart"] or checkpoint.day != today):
+            checkpoint.delete()
+            checkpoint = None
+        if checkpoint is None:
+            checkpoint = JobCheckpoint(job=JOB, day=today, phase=PHASES[0], last_id=0)
+        elif not dry_run:
+            self.stdout.write(f"Resuming at {checkpoint.phase} after loan #{checkpoint.last_id}.")
+
+        start = PHASES.index(checkpoint.phase)
+        for phase in PHASES[start:]:
+            after = checkpoint.last_id if phase == checkpoint.phase else 0
+            getattr(self, f"run_{phase}")(checkpoint, phase, after, today, size, dry_run)
+
+        if checkpoint.pk and not dry_run:
+            checkpoint.delete()
+        self.stdout.write(self.style.SUCCESS("Dry run complete; nothing was written." if dry_run else "Lifecycle sweep complete."))
+
+    def _save_checkpoint(self, checkpoint, phase, last_id, dry_run):
+        if dry_run:
+            return
+        checkpoint.phase, checkpoint.last_id = phase, last_id
+        checkpoint.save()
+
+    def run_statuses(self, checkpoint, phase, after, today, size, dry_run):
+        loans = open_loans()
+        total = loans.filter(id__gt=after).count()
+        done, counts = 0, {}
+        for chunk in chunks(loans, after, size):
+            with transaction.atomic():
+                for status, count in sweep_statuses(chunk, today, dry_run).items():
+                    counts[status] = counts.get(status, 0) + count
+                self._save_checkpoint(checkpoint, phase, chunk[-1].id, dry_run)
+            done += len(chunk)
+            self.stdout.write(f"statuses: {done}/{total} open loans checked")
+        summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items())) or "no changes"
+        self.stdout.write(f"statuses: {summary}")
+
+    def run_scores(self, checkpoint, phase, after, today, size, dry_run):
+        loans = unscored_loans()
+        total = loans.filter(id__gt=after).count()
+        done = 0
+        for chunk in chunks(loans, after, size):
+            with transaction.atomic():
+                score_loans(chunk, dry_run)
+                self._save_checkpoint(checkpoint, phase, chunk[-1].id, dry_run)
+            done += len(chunk)
+            self.stdout.write(f"scores: {done}/{total} completed loans scored")
+        if not total:
+            self.stdout.write("scores: no newly completed loans")
+
+    def run_flags(self, checkpoint, phase, after, today, size, dry_run):
+        flagged, cleared = reconcile_active_flags(dry_run)
+        self._save_checkpoint(checkpoint, phase, 0, dry_run)
+        self.stdout.write(f"flags: has_active_loan set on {flagged}, cleared on {cleared} customer(s)")
@@ -0,0 +1,119 @@
+import os
+import time
+from contextlib import ExitStack
+from datetime import date
+
+from django.db import connections
+from django.db.models import Count, Sum
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+# Under gunicorn each worker writes its samples to mmap files under
+# PROMETHEUS_MULTIPROC_DIR (exported before this module is imported) and
+# render_metrics sums them; without it they live in this process's registry.
+REQUEST_LATENCY = Histogram(
+    "microfinance_request_latency_seconds",
+    "Request latency by URL name",
+    ["view", "method"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESPONSES = Counter(
+    "microfinance_responses_total",
+    "Responses by URL name and status code",
+    ["view", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "microfinance_request_db_queries",
+    "Database queries per request by URL name",
+    ["view"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+
+UNRESOLVED = "<unresolved>"  # 404s share one label so paths can't blow up cardinality
+
+
+class _QueryCounter:
+    __slots__ = ("count",)
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware:
+    """Record latency, status and query count for every request under its URL name."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = _QueryCounter()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(counter))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - started
+
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else UNRESOLVED
+        REQUEST_LATENCY.labels(view, request.method).observe(elapsed)
+        RESPONSES.labels(view, str(response.status_code)).inc()
+        REQUEST_QUERIES.labels(view).observe(counter.count)
+        return response
+
+
+class BusinessCollector:
+    """Portfolio gauges, read from the database at scrape time so every worker agrees."""
+
+    def collect(self):
+        from .models import AdminTransactionRequest, Loan, Repayment  # avoid circular import
+
+        open_loans = GaugeMetricFamily(
+            "microfinance_open_loans", "Open loans by status", labels=["status"]
+        )
+        counts = dict(
+            Loan.objects.filter(status__in=Loan.OPEN_STATUSES)
+            .values_list("status").annotate(n=Count("id"))
+        )
+        for status in Loan.OPEN_STATUSES:
+            open_loans.add_metric([status], counts.get(status, 0))
+        yield open_loans
+
+        today = Repayment.objects.filter(date=date.today()).aggregate(
+            count=Count("id"), amount=Sum("amount_paid")
+        )
+        yield GaugeMetricFamily(
+            "microfinance_payments_today", "Repayments recorded today", value=today["count"]
+        )
+        yield GaugeMetricFamily(
+            "microfinance_payments_today_amount",
+            "Amount collected in repayments today",
+            value=float(today["amount"] or 0),
+        )
+        yield GaugeMetricFamily(
+            "microfinance_pending_transaction_requests",
+            "Agent cash requests awaiting admin approval",
+            value=AdminTransactionRequest.objects.filter(status="pending").count(),
+        )
+
+
+def render_metrics():
+    """All workers' request metrics plus the business gauges, in text exposition format."""
+    registry = CollectorRegistry()
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry.register(REGISTRY)
+    registry.register(BusinessCollector())
+    return generate_latest(registry)
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0013_rename_date_publicholiday_holiday_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('due_date', models.DateField()),
+                ('amount_due', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('paid_on', models.DateField(blank=True, null=True)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='installments', to='loans.loan')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['loan', 'due_date'], name='loans_loani_loan_id_3c2c95_idx'), models.Index(fields=['due_date'], name='loans_loani_due_dat_1afa52_idx')],
+                'unique_together': {('loan', 'number')},
+            },
+        ),
+    ]
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations
+
+CENT = Decimal("0.01")
+
+
+def backfill_installments(apps, schema_editor):
+    """
+    Build the schedule for loans created before LoanInstallment existed and
+    replay their repayments over it, oldest installment first.
+    """
+    Loan = apps.get_model("loans", "Loan")
+    LoanInstallment = apps.get_model("loans", "LoanInstallment")
+    Repayment = apps.get_model("loans", "Repayment")
+    PublicHoliday = apps.get_model("loans", "PublicHoliday")
+
+    holidays = set(PublicHoliday.objects.values_list("holiday_date", flat=True))
+
+    for loan in Loan.objects.exclude(start_date__isnull=True).iterator():
+        count = max(loan.duration_days, 1)
+        daily = Decimal(loan.daily_payment).quantize(CENT, rounding=ROUND_HALF_UP)
+        amounts = [daily] * (count - 1) + [loan.total_due - daily * (count - 1)]
+
+        installments = []
+        day = loan.start_date
+        for number, amount in enumerate(amounts, start=1):
+            while day.weekday() >= 5 or day in holidays:
+                day += timedelta(days=1)
+            installments.append(
+                LoanInstallment(loan=loan, number=number, due_date=day, amount_due=amount, amount_paid=0)
+            )
+            day += timedelta(days=1)
+
+        payments = list(Repayment.objects.filter(loan=loan).order_by("date").values_list("amount_paid", "date"))
+        unmatched = loan.total_paid - sum(amount for amount, _ in payments)
+        if unmatched > 0:
+            payments.append((unmatched, loan.last_paid_date or loan.start_date))
+
+        position = 0
+        for amount, paid_on in payments:
+            while amount > 0 and position < len(installments):
+                installment = installments[position]
+                applied = min(installment.amount_due - installment.amount_paid, amount)
+                installment.amount_paid += applied
+                amount -= applied
+                if installment.amount_paid >= installment.amount_due:
+                    installment.paid_on = paid_on
+                    position += 1
+
+        LoanInstallment.objects.bulk_create(installments)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0014_loaninstallment'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_installments, migrations.RunPython.noop),
+    ]
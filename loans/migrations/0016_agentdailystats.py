@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_agentprofile_amount_in_hand'),
+        ('loans', '0015_backfill_loan_installments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AgentDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('amount_expected', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('loans_expected', models.IntegerField(default=0)),
+                ('amount_collected', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('loans_collected', models.IntegerField(default=0)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='accounts.agentprofile')),
+            ],
+            options={
+                'unique_together': {('agent', 'date')},
+            },
+        ),
+    ]
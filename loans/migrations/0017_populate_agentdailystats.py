@@ -0,0 +1,41 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count, F, Q, Sum
+
+
+def populate_stats(apps, schema_editor):
+    """Fill the rollup from existing repayments and installments."""
+    AgentDailyStats = apps.get_model("loans", "AgentDailyStats")
+    LoanInstallment = apps.get_model("loans", "LoanInstallment")
+    Repayment = apps.get_model("loans", "Repayment")
+
+    stats = defaultdict(dict)
+    for row in Repayment.objects.values("recorded_by", "date").annotate(
+        amount=Sum("amount_paid"), loans=Count("loan", distinct=True)
+    ).order_by():
+        stats[(row["recorded_by"], row["date"])].update(amount_collected=row["amount"], loans_collected=row["loans"])
+
+    installments = LoanInstallment.objects.exclude(
+        Q(loan__status="completed") & Q(due_date__gt=F("loan__last_paid_date"))
+    )
+    for row in installments.values("loan__customer__agent", "due_date").annotate(
+        amount=Sum("amount_due"), loans=Count("loan", distinct=True)
+    ).order_by():
+        stats[(row["loan__customer__agent"], row["due_date"])].update(amount_expected=row["amount"], loans_expected=row["loans"])
+
+    AgentDailyStats.objects.bulk_create(
+        [AgentDailyStats(agent_id=agent_id, date=day, **values) for (agent_id, day), values in stats.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0016_agentdailystats'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,116 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:11
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalize_name(value):
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    value = re.sub(r"[^\w\s]", " ", value.lower())
+    return " ".join(value.split())
+
+
+def normalize_phone(value):
+    digits = re.sub(r"\D", "", value or "")
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith("268") and len(digits) > 8:
+        digits = digits[3:]
+    return digits
+
+
+def fill_search_fields(apps, schema_editor):
+    Customer = apps.get_model("loans", "Customer")
+    batch = []
+    for customer in Customer.objects.only("name", "phone").iterator(chunk_size=2000):
+        customer.name_normalized = normalize_name(customer.name)
+        customer.phone_normalized = normalize_phone(customer.phone)
+        batch.append(customer)
+        if len(batch) == 2000:
+            Customer.objects.bulk_update(batch, ["name_normalized", "phone_normalized"])
+            batch = []
+    Customer.objects.bulk_update(batch, ["name_normalized", "phone_normalized"])
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX loans_customer_name_trgm ON loans_customer USING gin (name_normalized gin_trgm_ops)",
+]
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS loans_customer_name_trgm",
+]
+
+# External-content FTS5 table kept current by triggers, so bulk inserts are
+# indexed too.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE loans_customer_fts USING fts5("
+    "name_normalized, content='loans_customer', content_rowid='id')",
+    "CREATE TRIGGER loans_customer_fts_ai AFTER INSERT ON loans_customer BEGIN "
+    "INSERT INTO loans_customer_fts(rowid, name_normalized) VALUES (new.id, new.name_normalized); END",
+    "CREATE TRIGGER loans_customer_fts_ad AFTER DELETE ON loans_customer BEGIN "
+    "INSERT INTO loans_customer_fts(loans_customer_fts, rowid, name_normalized) "
+    "VALUES ('delete', old.id, old.name_normalized); END",
+    "CREATE TRIGGER loans_customer_fts_au AFTER UPDATE OF name_normalized ON loans_customer BEGIN "
+    "INSERT INTO loans_customer_fts(loans_customer_fts, rowid, name_normalized) "
+    "VALUES ('delete', old.id, old.name_normalized); "
+    "INSERT INTO loans_customer_fts(rowid, name_normalized) VALUES (new.id, new.name_normalized); END",
+    "INSERT INTO loans_customer_fts(loans_customer_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS loans_customer_fts_ai",
+    "DROP TRIGGER IF EXISTS loans_customer_fts_ad",
+    "DROP TRIGGER IF EXISTS loans_customer_fts_au",
+    "DROP TABLE IF EXISTS loans_customer_fts",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_name_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+    elif vendor == "sqlite":
+        with schema_editor.connection.cursor() as cursor:
+            try:
+                cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(probe)")
+            except Exception:
+                return  # no FTS5 in this build; loans.search falls back to plain matching
+            cursor.execute("DROP TABLE temp.fts5_probe")
+        _run(schema_editor, SQLITE_FORWARD)
+
+
+def drop_name_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        _run(schema_editor, POSTGRES_REVERSE)
+    elif vendor == "sqlite":
+        _run(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0018_sync_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='name_normalized',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=15),
+        ),
+        migrations.RunPython(fill_search_fields, migrations.RunPython.noop),
+        migrations.RunPython(create_name_index, drop_name_index),
+    ]
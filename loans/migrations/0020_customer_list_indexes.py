@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_agentprofile_updated_at'),
+        ('loans', '0019_customer_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['agent', 'name', 'id'], name='loans_custo_agent_i_125d32_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['agent', 'credit_score', 'id'], name='loans_custo_agent_i_7dbc10_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['name', 'id'], name='loans_custo_name_e9236c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['credit_score', 'id'], name='loans_custo_credit__edfc3e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['location', 'name', 'id'], name='loans_custo_locatio_da190f_idx'),
+        ),
+    ]
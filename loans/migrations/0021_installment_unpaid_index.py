@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0020_customer_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loaninstallment',
+            index=models.Index(condition=models.Q(('paid_on__isnull', True)), fields=['due_date'], name='loans_installment_unpaid_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:17
+
+from django.db import migrations, models
+
+
+def mark_existing_completed_scored(apps, schema_editor):
+    # Loans completed before the lifecycle job existed are not rescored retroactively
+    Loan = apps.get_model("loans", "Loan")
+    Loan.objects.filter(status="completed").update(credit_scored=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0021_installment_unpaid_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50, unique=True)),
+                ('day', models.DateField()),
+                ('phase', models.CharField(max_length=50)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='credit_scored',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_completed_scored, migrations.RunPython.noop),
+    ]
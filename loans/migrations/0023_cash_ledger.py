@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_balances(apps, schema_editor):
+    """Start each agent's ledger with their current amount_in_hand."""
+    AgentProfile = apps.get_model("accounts", "AgentProfile")
+    CashLedgerEntry = apps.get_model("loans", "CashLedgerEntry")
+    CashLedgerEntry.objects.bulk_create([
+        CashLedgerEntry(agent=agent, amount=agent.amount_in_hand, kind="opening")
+        for agent in AgentProfile.objects.exclude(amount_in_hand=0)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_agentprofile_updated_at'),
+        ('loans', '0022_loan_lifecycle'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CashCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_entry_id', models.BigIntegerField()),
+                ('balance', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cash_checkpoints', to='accounts.agentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['agent', '-last_entry_id'], name='loans_cashc_agent_i_dbf1e2_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CashLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('kind', models.CharField(choices=[('opening', 'Opening balance'), ('collection', 'Repayment collected'), ('disbursement', 'Loan disbursed'), ('topup', 'Cash from admin'), ('remittance', 'Cash sent to admin'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('agent', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='cash_entries', to='accounts.agentprofile')),
+                ('loan', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='loans.loan')),
+                ('repayment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='loans.repayment')),
+                ('transaction_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='loans.admintransactionrequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['agent', 'id'], name='loans_cashl_agent_i_b0c271_idx')],
+            },
+        ),
+        migrations.RunPython(open_balances, migrations.RunPython.noop),
+    ]
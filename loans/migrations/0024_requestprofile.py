@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-17 16:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0023_cash_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(max_length=200)),
+                ('method', models.CharField(max_length=10)),
+                ('status', models.PositiveSmallIntegerField()),
+                ('total_ms', models.FloatField()),
+                ('sql_ms', models.FloatField()),
+                ('template_ms', models.FloatField()),
+                ('queries', models.PositiveIntegerField()),
+                ('slowest_sql', models.TextField(blank=True)),
+                ('slowest_sql_ms', models.FloatField(default=0)),
+                ('duplicated_sql', models.TextField(blank=True)),
+                ('duplicated_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_products(apps, schema_editor):
+    """The two offers LoanOfferView used to hard-code; existing loans on those terms point at them."""
+    LoanProduct = apps.get_model("loans", "LoanProduct")
+    Loan = apps.get_model("loans", "Loan")
+    for rate, days in ((20, 20), (25, 25)):
+        product = LoanProduct.objects.create(name=f"{days} days at {rate}%", interest_rate=rate, duration_days=days)
+        Loan.objects.filter(interest_rate=rate, duration_days=days).update(product=product)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0024_requestprofile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('interest_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('duration_days', models.PositiveIntegerField()),
+                ('min_amount', models.DecimalField(decimal_places=2, default=200, max_digits=10)),
+                ('max_amount', models.DecimalField(decimal_places=2, default=2000, max_digits=10)),
+                ('min_credit_band', models.CharField(blank=True, choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('top', 'Top')], max_length=10)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ['duration_days', 'interest_rate', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='loan',
+            name='product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='loans.loanproduct'),
+        ),
+        migrations.RunPython(seed_products, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_agentprofile_updated_at'),
+        ('loans', '0025_loan_products'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='admintransactionrequest',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['created_at'], name='loans_txrequest_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['status', 'credit_scored', 'customer'], name='loans_loan_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(condition=models.Q(('status__in', ('active', 'overdue', 'defaulted'))), fields=['customer', 'status'], name='loans_loan_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repayment',
+            index=models.Index(fields=['recorded_by', 'date', 'amount_paid'], name='loans_repayment_agent_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='repayment',
+            index=models.Index(fields=['date'], name='loans_repayment_date_idx'),
+        ),
+        # Drop the plain recorded_by index only once its replacement exists
+        migrations.AlterField(
+            model_name='repayment',
+            name='recorded_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='accounts.agentprofile'),
+        ),
+    ]
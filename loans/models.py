@@ -1,55 +1,134 @@
 from django.db import models
 from django.contrib.auth.models import User
 from datetime import date, timedelta
-from decimal import Decimal
 from accounts.models import AgentProfile
+from .admin_totals import invalidate_totals
+from .business_days import get_calendar, invalidate_calendar
+from .pricing import invalidate_catalog, price
+from .schedule import create_schedule
+from .stats import reassign_customer, record_schedule
+from .search import normalize_name, normalize_phone
+from .scoring import get_rules
+from .ledger import post_entry
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
 
 
 class Customer(models.Model):
+    # Credit score bands used to filter customer lists: (lowest, highest or None)
+    CREDIT_BANDS = {
+        "low": (0, 499),
+        "medium": (500, 999),
+        "high": (1000, 1499),
+        "top": (1500, None),
+    }
+
     agent = models.ForeignKey(AgentProfile, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     phone = models.CharField(max_length=15)
+    # Search keys kept in step with name/phone by save(); see loans.search
+    name_normalized = models.CharField(max_length=100, blank=True, default="", editable=False)
+    phone_normalized = models.CharField(max_length=15, blank=True, default="", editable=False, db_index=True)
     location = models.CharField(max_length=100, blank=True, null=True)  # <-- new field
     national_id = models.CharField(max_length=20, unique=True)
     created_at = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # sync cursor
 
     # Credit system fields
     credit_score = models.IntegerField(default=500)  # determines upper limit
     has_active_loan = models.BooleanField(default=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['agent', 'updated_at']),
+            # Keyset pagination: each sort order ends in id so the cursor is unique
+            models.Index(fields=['agent', 'name', 'id']),
+            models.Index(fields=['agent', 'credit_score', 'id']),
+            models.Index(fields=['name', 'id']),
+            models.Index(fields=['credit_score', 'id']),
+            models.Index(fields=['location', 'name', 'id']),
+        ]
+
     def __str__(self):
         return self.name
 
+    def normalize_search_fields(self):
+        """Refresh the search keys; call before bulk_create, which skips save()."""
+        self.name_normalized = normalize_name(self.name)
+        self.phone_normalized = normalize_phone(self.phone)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        customer = super().from_db(db, field_names, values)
+        # The agent as loaded, so save() can tell when the customer changes hands
+        customer._loaded_agent_id = customer.__dict__.get("agent_id")
+        return customer
+
+    def save(self, *args, **kwargs):
+        self.normalize_search_fields()
+        old_agent_id = getattr(self, "_loaded_agent_id", None)
+        update_fields = kwargs.get("update_fields")
+        moving = (
+            old_agent_id is not None and not self._state.adding
+            and (update_fields is None or "agent" in update_fields or "agent_id" in update_fields)
+            and self.agent_id != old_agent_id
+        )
+        # The agent's expected collections are keyed by customer__agent, so they move too
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if moving:
+                reassign_customer(self, old_agent_id)
+        self._loaded_agent_id = self.__dict__.get("agent_id")
+
     def loan_range(self):
         """Return current qualification range"""
         lower = 200
         upper = self.credit_score
         return lower, upper
 
-    def update_credit_score(self, loan):
+    def update_credit_score(self, loan, commit=True, rules=None):
         """Update score based on performance of the last loan"""
         if loan.status != "completed":
             return
 
         days_early = (loan.end_date - loan.last_paid_date).days if loan.last_paid_date else 0
+        # Bonuses, penalty and clamps come from loans.scoring.ScoringRules
+        self.credit_score = (rules or get_rules()).apply(self.credit_score, loan.installments_paid_late, days_early)
 
-        if loan.days_missed == 0 and days_early >= 3:
-            # Paid early
-            self.credit_score = min(self.credit_score + 250, 2000)
-        elif loan.days_missed == 0:
-            # Paid on time
-            self.credit_score = min(self.credit_score + 200, 2000)
-        else:
-            # Paid late or missed
-            self.credit_score = max(self.credit_score - 100, 200)
-
-        self.save()
+        if commit:  # batch callers save many customers at once with bulk_update
+            self.save()
 
 
     
 
+class LoanProduct(models.Model):
+    """A loan offer in the catalog; loans.pricing prices it and decides who may take it."""
+    name = models.CharField(max_length=100, unique=True)
+    interest_rate = models.DecimalField(max_digits=5, decimal_places=2)
+    duration_days = models.PositiveIntegerField()
+    min_amount = models.DecimalField(max_digits=10, decimal_places=2, default=200)
+    max_amount = models.DecimalField(max_digits=10, decimal_places=2, default=2000)
+    # Lowest credit band offered this product; blank offers it to every band
+    min_credit_band = models.CharField(
+        max_length=10, blank=True, choices=[(band, band.title()) for band in Customer.CREDIT_BANDS]
+    )
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ["duration_days", "interest_rate", "id"]
+
+    def __str__(self):
+        return f"{self.name} ({self.interest_rate}% over {self.duration_days} days)"
+
+
 class Loan(models.Model):
+    # Statuses that still owe money; overdue/defaulted are set by the nightly
+    # lifecycle job (manage.py run_loan_lifecycle)
+    OPEN_STATUSES = ("active", "overdue", "defaulted")
+
     customer = models.ForeignKey('Customer', on_delete=models.CASCADE)
+    product = models.ForeignKey(LoanProduct, on_delete=models.SET_NULL, null=True, blank=True)
     principal_amount = models.DecimalField(max_digits=10, decimal_places=2)
     interest_rate = models.DecimalField(max_digits=5, decimal_places=2, default=20)
     total_due = models.DecimalField(max_digits=10, decimal_places=2, blank=True)
@@ -61,48 +140,81 @@ class Loan(models.Model):
     last_paid_date = models.DateField(null=True, blank=True)
     days_paid = models.IntegerField(default=0)
     total_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    credit_scored = models.BooleanField(default=False)  # customer score updated for this loan
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # sync cursor
 
-    def save(self, *args, **kwargs):
-        from loans.models import PublicHoliday  # avoid circular import
+    class Meta:
+        indexes = [
+            # Status counts and sweeps (admin totals, metrics, lifecycle, nightly scoring),
+            # answered from the index alone
+            models.Index(fields=['status', 'credit_scored', 'customer'], name='loans_loan_status_idx'),
+            # Open loans (OPEN_STATUSES) per customer: agent dashboards and the has_active_loan
+            # sweep. PostgreSQL uses it; SQLite can't match a parameterised IN to the condition
+            # and falls back to the customer index, which is nearly as good there.
+            models.Index(
+                fields=['customer', 'status'],
+                condition=models.Q(status__in=('active', 'overdue', 'defaulted')),
+                name='loans_loan_open_idx',
+            ),
+        ]
 
-        # 1️⃣ Calculate financial values if missing
-        if not self.total_due:
-            self.total_due = self.principal_amount + (
-                self.principal_amount * self.interest_rate / Decimal(100)
-            )
-        if not self.daily_payment:
-            self.daily_payment = self.total_due / Decimal(self.duration_days)
+    def save(self, *args, **kwargs):
+        # 1️⃣ Calculate financial values if missing (loans.pricing, to the cent)
+        if not self.total_due or not self.daily_payment:
+            total_due, daily_payment, _ = price(self.principal_amount, self.interest_rate, self.duration_days)
+            self.total_due = self.total_due or total_due
+            self.daily_payment = self.daily_payment or daily_payment
 
         # 2️⃣ Determine valid start date (not today, not weekend, not public holiday)
         if not self.start_date:
-            proposed_date = date.today() + timedelta(days=1)  # start from tomorrow
-            holidays = set(PublicHoliday.objects.values_list("holiday_date", flat=True))
-            while proposed_date.weekday() >= 5 or proposed_date in holidays:
-                proposed_date += timedelta(days=1)
-            self.start_date = proposed_date
+            tomorrow = date.today() + timedelta(days=1)  # start from tomorrow
+            self.start_date = get_calendar().next_business_day(tomorrow)
 
         # 3️⃣ Set end date based on start date
         if not self.end_date:
             self.end_date = self.start_date + timedelta(days=self.duration_days)
 
-        super().save(*args, **kwargs)
+        # 4️⃣ New loans get their repayment schedule in the same transaction
+        creating = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if creating:
+                record_schedule(self, create_schedule(self))
 
     # ---------------- Utility methods ----------------
     @property
     def days_elapsed(self):
         return (date.today() - self.start_date).days
 
+    @property
+    def first_unpaid_due_date(self):
+        """Due date of the oldest unpaid installment (None once all are paid)."""
+        if hasattr(self, "next_due_date"):  # annotated by schedule.with_schedule_state
+            return self.next_due_date
+        installment = self.installments.filter(paid_on__isnull=True).order_by("due_date").first()
+        return installment.due_date if installment else None
+
     @property
     def is_due_today(self):
-        if self.status != "active":
+        if self.status not in self.OPEN_STATUSES:
             return False
         today = date.today()
-        return self.last_paid_date != today
+        next_due = self.first_unpaid_due_date
+        return self.last_paid_date != today and next_due is not None and next_due <= today
 
     @property
     def days_missed(self):
-        missed = self.days_elapsed - self.days_paid
-        return max(missed, 0)
+        """Installments that fell due before today and are still unpaid."""
+        if hasattr(self, "installments_missed"):  # annotated by schedule.with_schedule_state
+            return self.installments_missed
+        return self.installments.filter(paid_on__isnull=True, due_date__lt=date.today()).count()
+
+    @property
+    def installments_paid_late(self):
+        """Installments paid after their due date: what scoring counts as missed once a loan is paid off."""
+        if hasattr(self, "installments_late"):  # annotated by lifecycle.unscored_loans
+            return self.installments_late
+        return self.installments.filter(paid_on__gt=F("due_date")).count()
 
     @property
     def is_fully_paid(self):
@@ -124,12 +236,7 @@ class Loan(models.Model):
     @staticmethod
     def _next_business_day(d: date) -> date:
         """Return next valid business day (skip weekends + public holidays)."""
-        from loans.models import PublicHoliday
-        holidays = set(PublicHoliday.objects.values_list("holiday_date", flat=True))
-        nd = d
-        while nd.weekday() >= 5 or nd in holidays:  # 5=Sat, 6=Sun
-            nd += timedelta(days=1)
-        return nd
+        return get_calendar().next_business_day(d)
 
     @property
     def next_payment_date(self):
@@ -137,15 +244,13 @@ class Loan(models.Model):
             return None
 
         today = date.today()
+        next_due = self.first_unpaid_due_date
+        if next_due is None:
+            return None
 
-        if self.last_paid_date == today:
-            next_day = self._next_business_day(today + timedelta(days=1))
-        elif getattr(self, "days_missed", 0) > 0:
-            next_day = self._next_business_day(today)
-        elif not self.last_paid_date:
-            next_day = self._next_business_day(today)
-        else:
-            next_day = self._next_business_day(self.last_paid_date + timedelta(days=1))
+        # Arrears are collected today; nothing more is asked once paid today
+        earliest = today + timedelta(days=1) if self.last_paid_date == today else today
+        next_day = self._next_business_day(max(next_due, earliest))
 
         if next_day == today:
             return "Today"
@@ -156,20 +261,167 @@ class Loan(models.Model):
 
     def __str__(self):
         return f"{self.customer.name} - {self.principal_amount} SZL"
-    
+
+
+class LoanInstallment(models.Model):
+    """One scheduled daily payment of a loan, generated when the loan is created."""
+    loan = models.ForeignKey(Loan, on_delete=models.CASCADE, related_name="installments")
+    number = models.PositiveIntegerField()
+    due_date = models.DateField()
+    amount_due = models.DecimalField(max_digits=10, decimal_places=2)
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    paid_on = models.DateField(null=True, blank=True)  # set once fully paid
+
+    class Meta:
+        unique_together = ('loan', 'number')
+        indexes = [
+            models.Index(fields=['loan', 'due_date']),
+            models.Index(fields=['due_date']),
+            # Arrears scans (reports.compute_par) only touch unpaid rows
+            models.Index(fields=['due_date'], condition=models.Q(paid_on__isnull=True), name='loans_installment_unpaid_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.loan} - #{self.number} due {self.due_date}"
+
 
 class Repayment(models.Model):
     loan = models.ForeignKey(Loan, on_delete=models.CASCADE)
     date = models.DateField(default=date.today)
     amount_paid = models.DecimalField(max_digits=10, decimal_places=2)
-    recorded_by = models.ForeignKey(AgentProfile, on_delete=models.CASCADE)
+    # Indexed by loans_repayment_agent_date_idx below, which starts with this column
+    recorded_by = models.ForeignKey(AgentProfile, on_delete=models.CASCADE, db_index=False)
+    # Client-generated key from offline devices; a replayed upload matches it
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # sync cursor
 
     class Meta:
         unique_together = ('loan', 'date')  # Only one payment per day per loan
+        indexes = [
+            # Collections per agent and day (stats rebuild, exports); amount_paid is a key
+            # column rather than INCLUDE so the index covers the sum on SQLite too
+            models.Index(fields=['recorded_by', 'date', 'amount_paid'], name='loans_repayment_agent_date_idx'),
+            models.Index(fields=['date'], name='loans_repayment_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.loan.customer.name} - {self.amount_paid} on {self.date}"
 
+class AgentDailyStats(models.Model):
+    """Per-agent collection counters for one day, kept current by loans.stats."""
+    agent = models.ForeignKey(AgentProfile, on_delete=models.CASCADE, related_name="daily_stats")
+    date = models.DateField()
+    amount_expected = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    loans_expected = models.IntegerField(default=0)
+    amount_collected = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    loans_collected = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('agent', 'date')
+
+    def __str__(self):
+        return f"{self.agent} - {self.date}"
+
+    @property
+    def amount_collection_percentage(self):
+        if not self.amount_expected:
+            return 0
+        return round((self.amount_collected / self.amount_expected) * 100, 2)
+
+    @property
+    def loan_collection_percentage(self):
+        if not self.loans_expected:
+            return 0
+        return round((self.loans_collected / self.loans_expected) * 100, 2)
+
+
+class CashLedgerEntry(models.Model):
+    """
+    One movement of an agent's cash; append-only. The agent's amount_in_hand is
+    the sum of these, kept current by loans.ledger.post_entry.
+    """
+    KIND_CHOICES = (
+        ('opening', 'Opening balance'),
+        ('collection', 'Repayment collected'),
+        ('disbursement', 'Loan disbursed'),
+        ('topup', 'Cash from admin'),
+        ('remittance', 'Cash sent to admin'),
+        ('adjustment', 'Adjustment'),
+    )
+    agent = models.ForeignKey(AgentProfile, on_delete=models.PROTECT, related_name="cash_entries")
+    amount = models.DecimalField(max_digits=12, decimal_places=2)  # positive in, negative out
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    loan = models.ForeignKey(Loan, on_delete=models.SET_NULL, null=True, blank=True)
+    repayment = models.ForeignKey(Repayment, on_delete=models.SET_NULL, null=True, blank=True)
+    transaction_request = models.ForeignKey(
+        'AdminTransactionRequest', on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['agent', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.agent} {self.kind} {self.amount}"
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Cash ledger entries cannot be changed; post a correcting entry instead.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Cash ledger entries cannot be deleted; post a correcting entry instead.")
+
+
+class CashCheckpoint(models.Model):
+    """An agent's ledger balance up to and including ``last_entry_id``."""
+    agent = models.ForeignKey(AgentProfile, on_delete=models.CASCADE, related_name="cash_checkpoints")
+    last_entry_id = models.BigIntegerField()
+    balance = models.DecimalField(max_digits=12, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['agent', '-last_entry_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.agent} {self.balance} at #{self.last_entry_id}"
+
+
+class JobCheckpoint(models.Model):
+    """Where a resumable batch job stopped, so a rerun picks up from there."""
+    job = models.CharField(max_length=50, unique=True)
+    day = models.DateField()  # the business day the run is processing
+    phase = models.CharField(max_length=50)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.job} {self.day}: {self.phase} after #{self.last_id}"
+
+
+class RequestProfile(models.Model):
+    """A sampled request stored by loans.profiler when REQUEST_PROFILER_FLUSH_EVERY is set."""
+    view = models.CharField(max_length=200)
+    method = models.CharField(max_length=10)
+    status = models.PositiveSmallIntegerField()
+    total_ms = models.FloatField()
+    sql_ms = models.FloatField()
+    template_ms = models.FloatField()
+    queries = models.PositiveIntegerField()
+    slowest_sql = models.TextField(blank=True)
+    slowest_sql_ms = models.FloatField(default=0)
+    duplicated_sql = models.TextField(blank=True)
+    duplicated_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.method} {self.view} {self.total_ms:.0f} ms"
+
+
 # loans/models.py
 class LoanSettings(models.Model):
     interest_percent = models.DecimalField(max_digits=5, decimal_places=2, default=20)
@@ -193,13 +445,19 @@ class AdminTransactionRequest(models.Model):
     rejection_note = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # The admin queue only ever looks at pending requests, a small slice of the table
+            models.Index(fields=['created_at'], condition=models.Q(status='pending'), name='loans_txrequest_pending_idx'),
+        ]
+
     def approve(self, actual_amount=None):
         """Admin approves and updates agent balance."""
-        self.status = 'approved'
-        self.actual_received_amount = actual_amount or self.requested_amount
-        self.agent.amount_in_hand -= self.actual_received_amount
-        self.agent.save()
-        self.save()
+        with transaction.atomic():
+            self.status = 'approved'
+            self.actual_received_amount = actual_amount or self.requested_amount
+            post_entry(self.agent, -self.actual_received_amount, "remittance", transaction_request=self)
+            self.save()
 
 
     
@@ -212,4 +470,19 @@ class PublicHoliday(models.Model):
 
     @staticmethod
     def is_holiday(check_date: date) -> bool:
-        return PublicHoliday.objects.filter(holiday_date=check_date).exists()
+        return check_date in get_calendar().holidays
+
+
+# Keep the in-process business calendar in step with the holiday table
+post_save.connect(invalidate_calendar, sender=PublicHoliday)
+post_delete.connect(invalidate_calendar, sender=PublicHoliday)
+
+# Offers and loan limits are read from the in-process catalog
+for model in (LoanProduct, LoanSettings):
+    post_save.connect(invalidate_catalog, sender=model)
+    post_delete.connect(invalidate_catalog, sender=model)
+
+# Admin dashboard totals follow the rows they count
+for model in (Customer, Loan, Repayment, AdminTransactionRequest, LoanSettings):
+    post_save.connect(invalidate_totals, sender=model)
+    post_delete.connect(invalidate_totals, sender=model)
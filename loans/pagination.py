@@ -0,0 +1,130 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _encode(direction, values):
+    raw = json.dumps([direction, values], cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode(cursor, width):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor.")
+    if direction not in ("next", "prev") or not isinstance(values, list) or len(values) != width:
+        raise InvalidCursor("Malformed cursor.")
+    return direction, values
+
+
+def _flip(field):
+    return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class KeysetPaginator:
+    """
+    Cursor pagination over a fixed ordering whose last field is unique.
+
+    Each page is a range query that continues from the previous page's last
+    row, so page 1000 costs the same as page 1 when the ordering is indexed.
+    """
+
+    def __init__(self, queryset, ordering, per_page=DEFAULT_PER_PAGE):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+
+    def _key(self, obj):
+        values = []
+        for field in self.ordering:
+            value = obj
+            for part in field.lstrip("-").split("__"):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def _after(self, values, forward):
+        clauses = []
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip("-")
+            lookup = "gt" if field.startswith("-") != forward else "lt"
+            clause = Q(**{f"{name}__{lookup}": values[index]})
+            for previous, value in zip(self.ordering[:index], values[:index]):
+                clause &= Q(**{previous.lstrip("-"): value})
+            clauses.append(clause)
+        return reduce(or_, clauses)
+
+    def page(self, cursor=None):
+        direction, values = _decode(cursor, len(self.ordering)) if cursor else ("next", None)
+        forward = direction == "next"
+
+        ordering = self.ordering if forward else [_flip(field) for field in self.ordering]
+        queryset = self.queryset.order_by(*ordering)
+        try:
+            if values is not None:
+                queryset = queryset.filter(self._after(values, forward))
+            rows = list(queryset[: self.per_page + 1])
+        except (ValueError, TypeError, ValidationError):
+            raise InvalidCursor("Cursor does not match this listing.")
+
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if not forward:
+            rows.reverse()
+
+        has_next = has_more if forward else values is not None
+        has_previous = values is not None if forward else has_more
+        return KeysetPage(
+            rows,
+            _encode("next", self._key(rows[-1])) if rows and has_next else None,
+            _encode("prev", self._key(rows[0])) if rows and has_previous else None,
+        )
+
+
+def per_page_from(request, default=DEFAULT_PER_PAGE):
+    try:
+        return max(1, min(int(request.GET.get("per_page", default)), MAX_PER_PAGE))
+    except ValueError:
+        return default
+
+
+def cursor_url(request, cursor):
+    """The current URL, filters kept, pointing at ``cursor``."""
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return f"?{params.urlencode()}"
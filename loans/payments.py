@@ -0,0 +1,233 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .admin_totals import invalidate_totals
+from .models import Repayment
+from .schedule import allocate_payment, apply_payment
+from .ledger import post_entries, post_entry
+from .stats import record_collection, release_schedule
+
+
+class PaymentError(ValueError):
+    """A payment that can't be recorded; the message is shown to the agent."""
+
+
+def record_payment(loan, agent_profile, amount, day=None):
+    """
+    Record a repayment of ``amount`` on ``loan`` collected by ``agent_profile``.
+
+    The Repayment row, loan totals, installments, agent cash and daily stats
+    are all written in one transaction. The loan row is locked and re-read
+    first, so concurrent payments on one loan apply one after another instead
+    of overwriting each other's totals. Raises PaymentError for a second
+    payment on the same day, a loan that is already paid off or an amount
+    above what is left to pay.
+    """
+    from .models import Loan  # avoid circular import
+
+    day = day or date.today()
+    amount = Decimal(amount)
+    if not amount.is_finite() or amount <= 0:
+        raise PaymentError("Invalid payment amount.")
+
+    with transaction.atomic():
+        loan = Loan.objects.select_for_update().select_related("customer").get(pk=loan.pk)
+        if loan.status not in Loan.OPEN_STATUSES:
+            raise PaymentError("Loan is already fully paid.")
+        if amount > loan.remaining_balance:
+            raise PaymentError(f"Payment is more than the remaining balance of {loan.remaining_balance:.2f} SZL.")
+        # Under the loan lock this sees any payment committed by a racing request
+        if Repayment.objects.filter(loan=loan, date=day).exists():
+            raise PaymentError("Payment already recorded for this day.")
+        try:
+            with transaction.atomic():
+                repayment = Repayment.objects.create(
+                    loan=loan,
+                    date=day,
+                    amount_paid=amount,
+                    recorded_by=agent_profile
+                )
+        except IntegrityError:
+            # Written outside the lock (e.g. by a migration script); still a duplicate
+            raise PaymentError("Payment already recorded for this day.")
+
+        # ✅ Update loan financials
+        loan.total_paid += amount
+        loan.last_paid_date = max(loan.last_paid_date or day, day)
+        loan.days_paid += 1
+        apply_payment(loan, amount, day)
+        post_entry(agent_profile, amount, "collection", loan=loan, repayment=repayment)
+
+        # ✅ If total_paid >= total_due, mark loan as completed
+        if loan.remaining_balance <= 0:
+            loan.status = "completed"
+            release_schedule(loan, day)
+
+        loan.save(update_fields=["total_paid", "last_paid_date", "days_paid", "status", "updated_at"])
+        record_collection(agent_profile, day, amount)
+    return repayment
+
+
+MAX_BATCH_SIZE = 500
+# Fits Repayment.amount_paid, so an oversized amount is rejected instead of overflowing the column
+AMOUNT_FIELD = forms.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0.01"))
+
+
+def _parse_entry(entry, today):
+    """Return ``(loan_id, amount, day)`` or raise ValueError with a message for the agent."""
+    if not isinstance(entry, dict):
+        raise ValueError("Each entry must be an object.")
+    try:
+        loan_id = int(entry.get("loan_id"))
+    except (TypeError, ValueError):
+        raise ValueError("Missing or invalid loan_id.")
+    amount = None  # defaults to the loan's daily payment, as in MarkPaymentView
+    if entry.get("amount") not in (None, ""):
+        try:
+            amount = AMOUNT_FIELD.clean(str(entry["amount"]))
+        except ValidationError as exc:
+            raise ValueError(f"Invalid payment amount: {' '.join(exc.messages)}")
+    try:
+        day = date.fromisoformat(entry["date"]) if entry.get("date") else today
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date; use YYYY-MM-DD.")
+    if day > today:
+        raise ValueError("Payments cannot be recorded for a future date.")
+    return loan_id, amount, day
+
+
+def record_payments_bulk(agent_profile, entries):
+    """
+    Record a batch of ``{"loan_id", "amount", "date"}`` entries for one agent.
+    An optional ``idempotency_key`` per entry is stored on its Repayment; a key
+    repeated in the batch or already stored rejects that entry.
+
+    Entries are checked against the agent's active loans with one query, and
+    everything accepted is written in one transaction with bulk inserts and
+    updates. Returns one result dict per entry, in the order given.
+    """
+    from .models import CashLedgerEntry, Loan, LoanInstallment
+
+    today = date.today()
+    now = timezone.now()
+    results = [{"index": index, "status": "rejected"} for index in range(len(entries))]
+    parsed, keys = [], {}
+    for index, entry in enumerate(entries):
+        try:
+            loan_id, amount, day = _parse_entry(entry, today)
+        except ValueError as exc:
+            results[index]["error"] = str(exc)
+            continue
+        key = entry.get("idempotency_key") or None
+        if key is not None:
+            if not isinstance(key, str) or len(key) > 64:
+                results[index]["error"] = "Invalid idempotency_key."
+                continue
+            if key in keys.values():
+                results[index]["error"] = "idempotency_key repeated in this batch."
+                continue
+            keys[index] = key
+        parsed.append((index, loan_id, amount, day))
+
+    loan_ids = {loan_id for _, loan_id, _, _ in parsed}
+    with transaction.atomic():
+        loans = Loan.objects.select_for_update(of=("self",)).filter(
+            id__in=loan_ids, customer__agent=agent_profile, status__in=Loan.OPEN_STATUSES
+        ).in_bulk()
+        already_paid = set(
+            Repayment.objects.filter(loan_id__in=loans, date__in={day for _, _, _, day in parsed})
+            .values_list("loan_id", "date")
+        )
+        used_keys = set(
+            Repayment.objects.filter(idempotency_key__in=keys.values()).values_list("idempotency_key", flat=True)
+        )
+        unpaid = defaultdict(list)
+        for installment in LoanInstallment.objects.filter(loan_id__in=loans, paid_on__isnull=True).order_by("number"):
+            unpaid[installment.loan_id].append(installment)
+
+        repayments, changed_installments = {}, []
+        touched_loans, completed = {}, []
+        collected = defaultdict(lambda: [Decimal("0"), 0])
+
+        # Apply each loan's payments in date order so installments fill oldest first
+        for index, loan_id, amount, day in sorted(parsed, key=lambda item: (item[3], item[0])):
+            result = results[index]
+            result["loan_id"] = loan_id
+            loan = loans.get(loan_id)
+            if loan is None:
+                result["error"] = "Loan not found among your active loans."
+                continue
+            if loan.status not in Loan.OPEN_STATUSES:
+                result["error"] = "Loan is already fully paid."
+                continue
+            if keys.get(index) in used_keys:
+                result["error"] = "idempotency_key already used."
+                continue
+            if day < loan.start_date:
+                result["error"] = "Payments cannot be recorded before the loan starts."
+                continue
+            if (loan_id, day) in already_paid:
+                result["error"] = "Payment already recorded for this day."
+                continue
+            # The daily payment by default, but never more than is left to pay
+            amount = amount or min(loan.daily_payment, loan.remaining_balance)
+            if amount > loan.remaining_balance:
+                result["error"] = f"Payment is more than the remaining balance of {loan.remaining_balance:.2f} SZL."
+                continue
+            already_paid.add((loan_id, day))
+
+            repayments[index] = Repayment(
+                loan=loan,
+                date=day,
+                amount_paid=amount,
+                recorded_by=agent_profile,
+                idempotency_key=keys.get(index),
+            )
+            changed_installments.extend(allocate_payment(unpaid[loan_id], amount, day))
+            loan.total_paid += amount
+            loan.days_paid += 1
+            if not loan.last_paid_date or day > loan.last_paid_date:
+                loan.last_paid_date = day
+            if loan.remaining_balance <= 0:
+                loan.status = "completed"
+                completed.append(loan)
+            loan.updated_at = now
+            touched_loans[loan_id] = loan
+            collected[day][0] += amount
+            collected[day][1] += 1
+
+            result.update(status="recorded", amount=str(amount), date=day.isoformat())
+
+        Repayment.objects.bulk_create(repayments.values())
+        LoanInstallment.objects.bulk_update(set(changed_installments), ["amount_paid", "paid_on"], batch_size=500)
+        # bulk_update and update() skip auto_now, so updated_at is set by hand
+        Loan.objects.bulk_update(
+            touched_loans.values(),
+            ["total_paid", "days_paid", "last_paid_date", "status", "updated_at"],
+            batch_size=500,
+        )
+        for loan in completed:
+            release_schedule(loan, loan.last_paid_date)
+        if repayments:
+            invalidate_totals()  # bulk writes skip the model signals
+
+        post_entries([
+            CashLedgerEntry(
+                agent=agent_profile, amount=repayment.amount_paid, kind="collection",
+                loan=repayment.loan, repayment=repayment,
+            )
+            for repayment in repayments.values()
+        ])
+        for day, (amount, count) in collected.items():
+            record_collection(agent_profile, day, amount, loans=count)
+
+    for index, repayment in repayments.items():
+        results[index]["repayment_id"] = repayment.pk
+        results[index]["remaining_balance"] = str(repayment.loan.remaining_balance)
+    return results
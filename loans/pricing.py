@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+from decimal import ROUND_HALF_UP, Decimal
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .schedule import CENT, installment_amounts
+from .scoring import credit_band
+
+CATALOG_VERSION_KEY = "loans:product_catalog:version"
+
+
+@lru_cache(maxsize=4096)
+def price(amount, interest_rate, duration_days):
+    """
+    ``(total_due, daily_payment, installment amounts)`` for a loan, exact to the cent.
+
+    Interest is simple interest on the principal; the last installment
+    absorbs what rounding the daily payment leaves over.
+    """
+    amount, interest_rate = Decimal(amount), Decimal(interest_rate)
+    total_due = (amount + amount * interest_rate / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+    daily_payment = (total_due / duration_days).quantize(CENT, rounding=ROUND_HALF_UP)
+    return total_due, daily_payment, tuple(installment_amounts(total_due, daily_payment, duration_days))
+
+
+@dataclass(frozen=True)
+class Quote:
+    product: object
+    amount: Decimal
+    total_due: Decimal
+    daily_payment: Decimal
+    installments: tuple
+
+    @property
+    def interest(self):
+        return self.total_due - self.amount
+
+    @property
+    def final_payment(self):
+        return self.installments[-1]
+
+
+class Catalog:
+    """
+    Active LoanProducts and the LoanSettings row, loaded once per process.
+
+    Use ``get_catalog()`` rather than building one directly, so every request
+    shares it and it is reloaded only after a product or the settings change.
+    """
+
+    def __init__(self, products, settings, version=0):
+        self.products = list(products)
+        self.by_id = {product.pk: product for product in self.products}
+        self.by_name = {product.name: product for product in self.products}
+        self.settings = settings
+        self.version = version
+
+    @staticmethod
+    def _band_rank(band):
+        from .models import Customer  # avoid circular import
+
+        bands = list(Customer.CREDIT_BANDS)
+        return bands.index(band) if band in bands else -1
+
+    def offers_band(self, product, band):
+        return not product.min_credit_band or self._band_rank(band) >= self._band_rank(product.min_credit_band)
+
+    def eligible(self, customer, amount=None):
+        """Products open to ``customer``'s credit band, and to ``amount`` if given."""
+        band = credit_band(customer.credit_score)
+        return [
+            product for product in self.products
+            if self.offers_band(product, band)
+            and (amount is None or product.min_amount <= amount <= product.max_amount)
+        ]
+
+    def quote(self, amount, product):
+        amount = Decimal(amount).quantize(CENT, rounding=ROUND_HALF_UP)
+        total_due, daily_payment, installments = price(amount, product.interest_rate, product.duration_days)
+        return Quote(product, amount, total_due, daily_payment, installments)
+
+    def quote_table(self, amounts, products=None):
+        """``{amount: [Quote per product]}`` for every amount x product pair."""
+        products = self.products if products is None else products
+        return {amount: [self.quote(amount, product) for product in products] for amount in amounts}
+
+
+_catalog = None
+
+
+def get_catalog() -> Catalog:
+    """
+    Shared catalog for this process.
+
+    Reloaded when the version stored in the cache moves on; with a shared
+    cache backend a change in one worker reaches all of them.
+    """
+    global _catalog
+    version = cache.get(CATALOG_VERSION_KEY, 0)
+    if _catalog is None or _catalog.version != version:
+        from .models import LoanProduct, LoanSettings  # avoid circular import
+
+        _catalog = Catalog(LoanProduct.objects.filter(is_active=True), LoanSettings.objects.first(), version)
+    return _catalog
+
+
+def _bump_version():
+    global _catalog
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 1, None)
+    _catalog = None
+
+
+def invalidate_catalog(using=None, **kwargs):
+    """
+    Signal handler: reload products and settings after a LoanProduct or LoanSettings change.
+
+    The version moves on only once the change commits, so a reload started in
+    between cannot keep the old rows under the new version.
+    """
+    transaction.on_commit(_bump_version, using=using)
@@ -0,0 +1,201 @@
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template as DjangoTemplate
+
+SAMPLE_RATE = getattr(settings, "REQUEST_PROFILER_SAMPLE_RATE", 0.0)
+BUFFER_SIZE = getattr(settings, "REQUEST_PROFILER_BUFFER_SIZE", 1000)
+# Write samples to RequestProfile every N samples (0 keeps them in memory only)
+FLUSH_EVERY = getattr(settings, "REQUEST_PROFILER_FLUSH_EVERY", 0)
+MAX_SQL_LENGTH = 500
+
+_current = ContextVar("request_profile", default=None)
+_buffer = deque(maxlen=BUFFER_SIZE)
+_unflushed = []
+_lock = threading.Lock()
+
+
+class _Profile:
+    __slots__ = ("queries", "sql_seconds", "template_seconds")
+
+    def __init__(self):
+        self.queries = []  # (sql, seconds)
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+
+
+def _record_query(execute, sql, params, many, context):
+    profile = _current.get()
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        if profile is not None:
+            elapsed = time.perf_counter() - started
+            profile.queries.append((sql, elapsed))
+            profile.sql_seconds += elapsed
+
+
+_render = DjangoTemplate.render
+
+
+def _timed_render(self, context=None, request=None):
+    profile = _current.get()
+    if profile is None:
+        return _render(self, context, request)
+    started = time.perf_counter()
+    try:
+        return _render(self, context, request)
+    finally:
+        profile.template_seconds += time.perf_counter() - started
+
+
+def _install_template_timer():
+    # Only top-level renders go through the backend Template, so includes aren't
+    # counted twice. Installed by the middleware, and only once per process.
+    with _lock:
+        if DjangoTemplate.render is not _timed_render:
+            DjangoTemplate.render = _timed_render
+
+
+def _shorten(sql):
+    sql = re.sub(r"\s+", " ", sql)
+    return sql if len(sql) <= MAX_SQL_LENGTH else sql[:MAX_SQL_LENGTH] + "…"
+
+
+def _summarize(request, response, profile, total_seconds):
+    match = getattr(request, "resolver_match", None)
+    repeats = Counter(sql for sql, _ in profile.queries)
+    duplicated = [(_shorten(sql), count) for sql, count in repeats.most_common(3) if count > 1]
+    slowest = max(profile.queries, key=lambda query: query[1], default=None)
+    return {
+        "view": match.view_name if match else request.path,
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "at": time.time(),
+        "total_ms": total_seconds * 1000,
+        "sql_ms": profile.sql_seconds * 1000,
+        "template_ms": profile.template_seconds * 1000,
+        "queries": len(profile.queries),
+        "slowest_sql": _shorten(slowest[0]) if slowest else "",
+        "slowest_sql_ms": slowest[1] * 1000 if slowest else 0,
+        "duplicated": duplicated,
+    }
+
+
+def _flush(samples):
+    from .models import RequestProfile  # avoid circular import
+
+    RequestProfile.objects.bulk_create([
+        RequestProfile(
+            view=sample["view"][:200],
+            method=sample["method"],
+            status=sample["status"],
+            total_ms=sample["total_ms"],
+            sql_ms=sample["sql_ms"],
+            template_ms=sample["template_ms"],
+            queries=sample["queries"],
+            slowest_sql=sample["slowest_sql"],
+            slowest_sql_ms=sample["slowest_sql_ms"],
+            duplicated_sql=sample["duplicated"][0][0] if sample["duplicated"] else "",
+            duplicated_count=sample["duplicated"][0][1] if sample["duplicated"] else 0,
+        )
+        for sample in samples
+    ])
+
+
+class RequestProfilerMiddleware:
+    """
+    Time a sample of requests: total latency, SQL count and time, the slowest and
+    most repeated statements, and template rendering. Samples land in a bounded
+    per-process ring buffer read by ``view_summaries``.
+
+    Unsampled requests cost one random() call.
+    """
+
+    def __init__(self, get_response, sample_rate=None):
+        self.get_response = get_response
+        self.sample_rate = SAMPLE_RATE if sample_rate is None else sample_rate
+        if self.sample_rate:
+            _install_template_timer()
+
+    def __call__(self, request):
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = _Profile()
+        token = _current.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        sample = _summarize(request, response, profile, time.perf_counter() - started)
+
+        with _lock:
+            _buffer.append(sample)
+            if FLUSH_EVERY:
+                _unflushed.append(sample)
+                pending = _unflushed[:] if len(_unflushed) >= FLUSH_EVERY else None
+                if pending:
+                    _unflushed.clear()
+        if FLUSH_EVERY and pending:
+            _flush(pending)
+        return response
+
+
+def recent_samples():
+    with _lock:
+        return list(_buffer)
+
+
+def clear_samples():
+    with _lock:
+        _buffer.clear()
+        _unflushed.clear()
+
+
+def _p95(values):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * 0.95))]
+
+
+def view_summaries(samples=None):
+    """Per-view aggregates over the buffered samples, slowest p95 first."""
+    by_view = defaultdict(list)
+    for sample in samples if samples is not None else recent_samples():
+        by_view[sample["view"]].append(sample)
+
+    summaries = []
+    for view, rows in by_view.items():
+        count = len(rows)
+        slowest = max(rows, key=lambda row: row["slowest_sql_ms"])
+        duplicates = Counter()
+        for row in rows:
+            for sql, repeats in row["duplicated"]:
+                duplicates[sql] = max(duplicates[sql], repeats)
+        summaries.append({
+            "view": view,
+            "count": count,
+            "avg_ms": sum(row["total_ms"] for row in rows) / count,
+            "p95_ms": _p95([row["total_ms"] for row in rows]),
+            "avg_queries": sum(row["queries"] for row in rows) / count,
+            "max_queries": max(row["queries"] for row in rows),
+            "avg_sql_ms": sum(row["sql_ms"] for row in rows) / count,
+            "avg_template_ms": sum(row["template_ms"] for row in rows) / count,
+            "slowest_sql": slowest["slowest_sql"],
+            "slowest_sql_ms": slowest["slowest_sql_ms"],
+            "duplicated": duplicates.most_common(1)[0] if duplicates else None,
+        })
+    return sorted(summaries, key=lambda summary: summary["p95_ms"], reverse=True)
@@ -0,0 +1,157 @@
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = "replica"
+PIN_COOKIE = "db_pin"
+# How long after a write the user's reads stay on the primary
+PIN_SECONDS = getattr(settings, "REPLICA_PIN_SECONDS", 10)
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS", "TRACE")
+# Logins and sessions are read on every request and must exist the moment they are created
+PRIMARY_APPS = {"auth", "sessions"}
+
+_current = ContextVar("replica_request", default=None)
+
+
+class _Request:
+    # A mutable holder rather than flags in the ContextVar itself, so writes made
+    # where the context was copied (sync_to_async) still reach the middleware
+    __slots__ = ("pinned", "use_replica", "wrote")
+
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.use_replica = False
+        self.wrote = False
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+class ReplicaRouter:
+    """
+    Reads inside a ``read_from_replica`` view go to the ``replica`` database,
+    unless the user is pinned to the primary or the model is a login or
+    session; everything else uses ``default``.
+    Without a replica configured this router changes nothing.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if (
+            state is None or not state.use_replica or state.pinned
+            or model._meta.app_label in PRIMARY_APPS
+            or not replica_configured() or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return None
+        return REPLICA
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # the replica holds the same rows
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
+
+
+class ReplicaPinMiddleware:
+    """
+    Track writes per request and pin the user to the primary for PIN_SECONDS
+    after any of them, so a user never reads a replica that lags behind their
+    own change. The pin is a short-lived cookie, so every worker honours it.
+
+    Unsafe methods count as writes even if they wrote nothing.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = _Request(pinned=PIN_COOKIE in request.COOKIES or request.method not in SAFE_METHODS)
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        if (state.wrote or request.method not in SAFE_METHODS) and replica_configured():
+            response.set_cookie(PIN_COOKIE, "1", max_age=PIN_SECONDS, httponly=True, samesite="Lax")
+        return response
+
+
+def _stream_from_replica(content, state):
+    # Streaming bodies are read after the view has returned and the middleware
+    # has reset the context, so put this request's state back while iterating
+    previous = _current.get()
+    _current.set(state)
+    try:
+        yield from content
+    finally:
+        _current.set(previous)
+
+
+def _replica_response(response, state):
+    if response.streaming:
+        streamed = _Request(state.pinned)
+        streamed.use_replica = True
+        response.streaming_content = _stream_from_replica(response.streaming_content, streamed)
+    return response
+
+
+async def _await_on_replica(coroutine, state):
+    state.use_replica = True
+    try:
+        response = await coroutine
+    finally:
+        state.use_replica = False
+    return _replica_response(response, state)
+
+
+def read_from_replica(view):
+    """
+    Opt a view into replica reads. Use on views that only read and can show
+    data a few seconds old: reports, exports and admin lists.
+
+    For class-based views, apply with ``method_decorator(..., name="dispatch")``.
+    Works for async views too.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        state = _current.get()
+        if state is None:  # ReplicaPinMiddleware not installed
+            return view(request, *args, **kwargs)
+        state.use_replica = True
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            state.use_replica = False
+        if asyncio.iscoroutine(response):  # an async view: nothing has run yet
+            return _await_on_replica(response, state)
+        return _replica_response(response, state)
+
+    if iscoroutinefunction(view):
+        markcoroutinefunction(wrapper)
+    return wrapper
+
+
+@contextmanager
+def primary():
+    """Read from the primary inside a replica view, e.g. for results that get cached."""
+    state = _current.get()
+    if state is None or not state.use_replica:
+        yield
+        return
+    state.use_replica = False
+    try:
+        yield
+    finally:
+        state.use_replica = True
@@ -0,0 +1,121 @@
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .business_days import get_calendar
+
+CENT = Decimal("0.01")
+
+
+def installment_amounts(total_due, daily_payment, count):
+    """Per-installment amounts; the last one absorbs the rounding difference."""
+    total_due = Decimal(total_due).quantize(CENT, rounding=ROUND_HALF_UP)
+    daily = Decimal(daily_payment).quantize(CENT, rounding=ROUND_HALF_UP)
+    if count <= 1:
+        return [total_due]
+    return [daily] * (count - 1) + [total_due - daily * (count - 1)]
+
+
+def build_installments(loan, calendar=None):
+    """Unsaved LoanInstallment rows for ``loan``, one per business day from start_date."""
+    from .models import LoanInstallment  # avoid circular import
+
+    calendar = calendar or get_calendar()
+    amounts = installment_amounts(loan.total_due, loan.daily_payment, loan.duration_days)
+    return [
+        LoanInstallment(
+            loan=loan,
+            number=number,
+            due_date=calendar.add_business_days(loan.start_date, number - 1),
+            amount_due=amount,
+        )
+        for number, amount in enumerate(amounts, start=1)
+    ]
+
+
+def create_schedule(loan):
+    from .models import LoanInstallment
+
+    return LoanInstallment.objects.bulk_create(build_installments(loan))
+
+
+def insert_installments(rows):
+    """
+    Insert installments given as ``(loan_id, number, due_date, amount_due, amount_paid, paid_on)``.
+
+    For imports of many loans at once: multi-row INSERTs with no model
+    instance per installment, which is where bulk_create spends its time.
+    """
+    from django.db import connection
+    from .models import LoanInstallment
+
+    names = ("loan", "number", "due_date", "amount_due", "amount_paid", "paid_on")
+    fields = [LoanInstallment._meta.get_field(name) for name in names]
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    table = connection.ops.quote_name(LoanInstallment._meta.db_table)
+    placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+    size = connection.ops.bulk_batch_size(fields, rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), size):
+            batch = rows[start:start + size]
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) VALUES " + ", ".join([placeholders] * len(batch)),
+                [value for row in batch for value in row],
+            )
+
+
+def allocate_payment(installments, amount, paid_on):
+    """
+    Spread ``amount`` over ``installments`` (oldest first) and return the rows
+    that changed. An installment is stamped ``paid_on`` once fully covered.
+    """
+    remaining = Decimal(amount)
+    changed = []
+    for installment in installments:
+        if remaining <= 0:
+            break
+        outstanding = installment.amount_due - installment.amount_paid
+        if outstanding <= 0:
+            continue
+        applied = min(outstanding, remaining)
+        installment.amount_paid += applied
+        remaining -= applied
+        if installment.amount_paid >= installment.amount_due:
+            installment.paid_on = paid_on
+        changed.append(installment)
+    return changed
+
+
+def apply_payment(loan, amount, paid_on):
+    """Update the loan's unpaid installment rows for a payment of ``amount``."""
+    from .models import LoanInstallment
+
+    unpaid = loan.installments.filter(paid_on__isnull=True).order_by("number")
+    changed = allocate_payment(unpaid, amount, paid_on)
+    LoanInstallment.objects.bulk_update(changed, ["amount_paid", "paid_on"])
+    return changed
+
+
+def with_schedule_state(loans, day=None):
+    """
+    Annotate a Loan queryset with ``next_due_date`` and ``installments_missed``
+    so ``next_payment_date``, ``days_missed`` and ``is_due_today`` need no
+    further queries per loan.
+    """
+    from .models import LoanInstallment
+
+    day = day or date.today()
+    unpaid = LoanInstallment.objects.filter(loan=OuterRef("pk"), paid_on__isnull=True)
+    missed = (
+        unpaid.filter(due_date__lt=day)
+        .order_by()
+        .values("loan")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return loans.annotate(
+        next_due_date=Subquery(unpaid.order_by("due_date").values("due_date")[:1]),
+        installments_missed=Coalesce(Subquery(missed), 0),
+    )
@@ -0,0 +1,126 @@
+from collections import Counter
+from dataclasses import asdict, dataclass, replace
+from itertools import groupby
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+# Installments paid after their due date: for a paid-off loan, its missed days
+LATE_INSTALLMENTS = Count("installments", filter=Q(installments__paid_on__gt=F("installments__due_date")))
+
+
+@dataclass(frozen=True)
+class ScoringRules:
+    """How one completed loan moves a customer's credit score."""
+    initial_score: int = 500
+    early_days: int = 3  # finished at least this many days before end_date
+    early_bonus: int = 250
+    on_time_bonus: int = 200
+    late_penalty: int = 100
+    min_score: int = 200
+    max_score: int = 2000
+
+    def apply(self, score, days_missed, days_early):
+        if days_missed == 0 and days_early >= self.early_days:
+            # Paid early
+            return min(score + self.early_bonus, self.max_score)
+        if days_missed == 0:
+            # Paid on time
+            return min(score + self.on_time_bonus, self.max_score)
+        # Paid late or missed
+        return max(score - self.late_penalty, self.min_score)
+
+
+def get_rules(**overrides):
+    """The configured rules (``CREDIT_SCORING_RULES`` setting) with ``overrides`` applied."""
+    rules = ScoringRules(**getattr(settings, "CREDIT_SCORING_RULES", {}))
+    return replace(rules, **{name: value for name, value in overrides.items() if value is not None})
+
+
+def loan_history():
+    """
+    Every completed loan as ``(customer_id, current_score, days_missed, days_early)``,
+    ordered by customer and then repayment order, streamed from one query.
+    """
+    from .models import Loan  # avoid circular import
+
+    rows = Loan.objects.filter(status="completed").annotate(late=LATE_INSTALLMENTS).order_by(
+        "customer_id", "last_paid_date", "id"
+    ).values_list("customer_id", "customer__credit_score", "end_date", "last_paid_date", "late")
+    for customer_id, score, end_date, last_paid_date, late in rows.iterator(chunk_size=10000):
+        days_early = (end_date - last_paid_date).days if end_date and last_paid_date else 0
+        yield customer_id, score, late, days_early
+
+
+def fold_scores(history, rules):
+    """Yield ``(customer_id, current_score, recomputed_score)`` from ``loan_history`` rows."""
+    for customer_id, loans in groupby(history, key=lambda row: row[0]):
+        score = None
+        for _, current, days_missed, days_early in loans:
+            if score is None:
+                score, before = rules.initial_score, current
+            score = rules.apply(score, days_missed, days_early)
+        yield customer_id, before, score
+
+
+def credit_band(score):
+    """Name of the Customer.CREDIT_BANDS band ``score`` falls in, or None."""
+    from .models import Customer
+
+    for name, (low, high) in Customer.CREDIT_BANDS.items():
+        if score >= low and (high is None or score <= high):
+            return name
+    return None
+
+
+def rescore_customers(rules=None, what_if=False, batch_size=2000):
+    """
+    Rebuild the score of every customer with completed loans from their history.
+
+    Changed scores are written with ``bulk_update`` in batches; with ``what_if``
+    nothing is written. Returns a report of how the score distribution moves.
+    """
+    from .models import Customer, Loan
+
+    rules = rules or get_rules()
+    now = timezone.now()
+    report = {
+        "rules": asdict(rules),
+        "customers": 0,
+        "raised": 0,
+        "lowered": 0,
+        "total_before": 0,
+        "total_after": 0,
+        "bands_before": Counter(),
+        "bands_after": Counter(),
+    }
+    batch = []
+
+    with transaction.atomic():
+        for customer_id, before, after in fold_scores(loan_history(), rules):
+            report["customers"] += 1
+            report["total_before"] += before
+            report["total_after"] += after
+            report["bands_before"][credit_band(before)] += 1
+            report["bands_after"][credit_band(after)] += 1
+            if after == before:
+                continue
+            report["raised" if after > before else "lowered"] += 1
+            if what_if:
+                continue
+            batch.append(Customer(pk=customer_id, credit_score=after, updated_at=now))
+            if len(batch) >= batch_size:
+                Customer.objects.bulk_update(batch, ["credit_score", "updated_at"])
+                batch = []
+        if batch:
+            Customer.objects.bulk_update(batch, ["credit_score", "updated_at"])
+        if not what_if:
+            # Every completed loan is now reflected in its customer's score
+            Loan.objects.filter(status="completed", credit_scored=False).update(credit_scored=True, updated_at=now)
+
+    count = report["customers"] or 1
+    report["mean_before"] = round(report["total_before"] / count, 1)
+    report["mean_after"] = round(report["total_after"] / count, 1)
+    return report
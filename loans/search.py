@@ -0,0 +1,132 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.db import connections
+from django.db.models import Case, Count, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, Length
+
+DEFAULT_LIMIT = 20
+FTS_TABLE = "loans_customer_fts"
+
+
+def normalize_name(value):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    value = re.sub(r"[^\w\s]", " ", value.lower())
+    return " ".join(value.split())
+
+
+def normalize_phone(value):
+    """Digits only, without the +268 country code, so local and international forms match."""
+    digits = re.sub(r"\D", "", value or "")
+    if digits.startswith("00"):
+        digits = digits[2:]
+    if digits.startswith("268") and len(digits) > 8:
+        digits = digits[3:]
+    return digits
+
+
+def _prefix_range(prefix):
+    """
+    ``(low, high)`` bounds matching every string that starts with ``prefix``.
+
+    A plain range comparison uses the B-tree index on every backend, unlike
+    LIKE, which SQLite only indexes with case-sensitive matching.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _filter_prefix(queryset, field, prefix):
+    low, high = _prefix_range(prefix)
+    return queryset.filter(**{f"{field}__gte": low, f"{field}__lt": high})
+
+
+@lru_cache(maxsize=None)
+def _sqlite_fts_available(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+        return cursor.fetchone() is not None
+
+
+def _filter_name(queryset, name):
+    """Match and rank by name with the best index the database offers."""
+    # The database the query will run on, which the replica router may pick
+    connection = connections[queryset.db]
+    if connection.vendor == "postgresql":
+        # Trigram GIN index: tolerant of typos and partial words
+        from django.contrib.postgres.search import TrigramSimilarity
+
+        return queryset.filter(name_normalized__trigram_similar=name).annotate(
+            rank=TrigramSimilarity("name_normalized", name)
+        ).order_by("-rank", "name")
+
+    if connection.vendor == "sqlite" and _sqlite_fts_available(connection.alias):
+        # FTS5 prefix query: every word typed must start a word of the name
+        match = " ".join(f'"{word}"*' for word in name.split())
+        queryset = queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        )
+    else:
+        for word in name.split():
+            queryset = queryset.filter(name_normalized__contains=word)
+
+    # Names that start with the query first, then shorter (closer) names
+    return queryset.annotate(
+        rank=Case(When(name_normalized__startswith=name, then=Value(0)), default=Value(1), output_field=IntegerField())
+    ).order_by("rank", Length("name"), "name")
+
+
+def search_customers(agent_profile, name="", phone="", national_id="", limit=DEFAULT_LIMIT):
+    """
+    The agent's customers matching every criterion given, best matches first.
+
+    Phone and national ID are prefix matches; each result carries ``loan_count``.
+    """
+    from .models import Customer, Loan  # avoid circular import
+
+    customers = Customer.objects.filter(agent=agent_profile)
+    name, phone, national_id = normalize_name(name), normalize_phone(phone), national_id.strip()
+    if not (name or phone or national_id):
+        return []
+    if phone:
+        customers = _filter_prefix(customers, "phone_normalized", phone)
+    if national_id:
+        customers = _filter_prefix(customers, "national_id", national_id)
+    if name:
+        customers = _filter_name(customers, name)
+    else:
+        customers = customers.order_by("name")
+
+    loan_count = (
+        Loan.objects.filter(customer=OuterRef("pk"))
+        .order_by()
+        .values("customer")
+        .annotate(count=Count("id"))
+        .values("count")
+    )
+    return list(customers.annotate(loan_count=Coalesce(Subquery(loan_count), 0))[:limit])
+
+
+def typeahead(agent_profile, query, limit=DEFAULT_LIMIT):
+    """
+    Single-box lookup: digits search phone numbers and national IDs, anything
+    else searches names. National ID matches come first.
+    """
+    query = query.strip()
+    if not query:
+        return []
+    by_id = search_customers(agent_profile, national_id=query, limit=limit)
+    if normalize_phone(query) and re.fullmatch(r"[\d\s()+-]+", query):
+        others = search_customers(agent_profile, phone=query, limit=limit)
+    else:
+        others = search_customers(agent_profile, name=query, limit=limit)
+
+    results, seen = [], set()
+    for customer in by_id + others:
+        if customer.pk not in seen:
+            seen.add(customer.pk)
+            results.append(customer)
+    return results[:limit]
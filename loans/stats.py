@@ -0,0 +1,197 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+
+def _increment(agent_id, days, **deltas):
+    """Add ``deltas`` to the agent's counters on each of ``days`` with F() updates."""
+    from .models import AgentDailyStats  # avoid circular import
+
+    days = list(days)
+    if not days:
+        return
+    AgentDailyStats.objects.bulk_create(
+        [AgentDailyStats(agent_id=agent_id, date=day) for day in days],
+        ignore_conflicts=True,
+    )
+    AgentDailyStats.objects.filter(agent_id=agent_id, date__in=days).update(
+        **{field: F(field) + value for field, value in deltas.items()}
+    )
+
+
+def _increment_expected(agent_id, installments, sign=1):
+    # Installments share one amount except the last, so this is one or two UPDATEs
+    days_by_amount = defaultdict(list)
+    for installment in installments:
+        days_by_amount[installment.amount_due].append(installment.due_date)
+    for amount, days in days_by_amount.items():
+        _increment(agent_id, days, amount_expected=sign * amount, loans_expected=sign)
+
+
+def record_schedule(loan, installments):
+    """A loan was disbursed: each installment day now expects a collection."""
+    _increment_expected(loan.customer.agent_id, installments)
+
+
+def record_schedules(schedules):
+    """
+    Many loans were disbursed at once: ``schedules`` is ``[(agent_id, [(due_date, amount_due)])]``.
+
+    Days are summed per agent first, so the UPDATEs are bounded by the agent
+    days touched rather than the number of loans.
+    """
+    per_day = defaultdict(lambda: [Decimal("0"), 0])
+    for agent_id, installments in schedules:
+        for due_date, amount_due in installments:
+            totals = per_day[(agent_id, due_date)]
+            totals[0] += amount_due
+            totals[1] += 1
+    grouped = defaultdict(list)
+    for (agent_id, day), (amount, loans) in per_day.items():
+        grouped[(agent_id, amount, loans)].append(day)
+    for (agent_id, amount, loans), days in grouped.items():
+        _increment(agent_id, days, amount_expected=amount, loans_expected=loans)
+
+
+def release_schedule(loan, after):
+    """A loan was paid off early: its installments due after ``after`` are no longer expected."""
+    future = loan.installments.filter(due_date__gt=after)
+    _increment_expected(loan.customer.agent_id, future, sign=-1)
+
+
+def reassign_customer(customer, old_agent_id):
+    """
+    ``customer`` moved from ``old_agent_id`` to ``customer.agent``: the expected
+    counters for their loans follow them, as ``compute_stats`` would attribute them.
+    """
+    if old_agent_id == customer.agent_id:
+        return
+    installments = list(_counted_installments().filter(loan__customer=customer).only("due_date", "amount_due"))
+    _increment_expected(old_agent_id, installments, sign=-1)
+    _increment_expected(customer.agent_id, installments)
+
+
+def record_collection(agent, day, amount, loans=1):
+    """``agent`` collected ``amount`` from ``loans`` loan(s) on ``day``."""
+    _increment(agent.pk, [day], amount_collected=amount, loans_collected=loans)
+
+
+# ---------------- Rebuilding from source tables ----------------
+
+def _counted_installments():
+    from .models import LoanInstallment  # avoid circular import
+
+    # A loan paid off early stops expecting anything after its last payment
+    return LoanInstallment.objects.exclude(
+        Q(loan__status="completed") & Q(due_date__gt=F("loan__last_paid_date"))
+    )
+
+
+def compute_stats(start=None, end=None):
+    """
+    Recompute every counter from Repayment and LoanInstallment rows.
+
+    Returns ``{(agent_id, date): {field: value}}`` for days that have activity.
+    """
+    from .models import Repayment
+
+    stats = defaultdict(lambda: {
+        "amount_expected": Decimal("0"),
+        "loans_expected": 0,
+        "amount_collected": Decimal("0"),
+        "loans_collected": 0,
+    })
+
+    repayments = Repayment.objects.all()
+    installments = _counted_installments()
+    if start:
+        repayments = repayments.filter(date__gte=start)
+        installments = installments.filter(due_date__gte=start)
+    if end:
+        repayments = repayments.filter(date__lte=end)
+        installments = installments.filter(due_date__lte=end)
+
+    for row in repayments.values("recorded_by", "date").annotate(
+        amount=Sum("amount_paid"), loans=Count("loan", distinct=True)
+    ).order_by():
+        entry = stats[(row["recorded_by"], row["date"])]
+        entry["amount_collected"] = row["amount"]
+        entry["loans_collected"] = row["loans"]
+
+    for row in installments.values("loan__customer__agent", "due_date").annotate(
+        amount=Sum("amount_due"), loans=Count("loan", distinct=True)
+    ).order_by():
+        entry = stats[(row["loan__customer__agent"], row["due_date"])]
+        entry["amount_expected"] = row["amount"]
+        entry["loans_expected"] = row["loans"]
+
+    return stats
+
+
+def rebuild_stats(start=None, end=None):
+    """Replace the stored counters in the date range with freshly computed ones."""
+    from .models import AgentDailyStats
+
+    stats = compute_stats(start, end)
+    stored = AgentDailyStats.objects.all()
+    if start:
+        stored = stored.filter(date__gte=start)
+    if end:
+        stored = stored.filter(date__lte=end)
+
+    with transaction.atomic():
+        stored.delete()
+        AgentDailyStats.objects.bulk_create(
+            [AgentDailyStats(agent_id=agent_id, date=day, **values) for (agent_id, day), values in stats.items()],
+            batch_size=1000,
+        )
+    return len(stats)
+
+
+def verify_stats(start=None, end=None):
+    """Return ``(agent_id, date, field, stored, expected)`` for every counter that has drifted."""
+    from .models import AgentDailyStats
+
+    stats = compute_stats(start, end)
+    stored = AgentDailyStats.objects.all()
+    if start:
+        stored = stored.filter(date__gte=start)
+    if end:
+        stored = stored.filter(date__lte=end)
+
+    zero = {"amount_expected": 0, "loans_expected": 0, "amount_collected": 0, "loans_collected": 0}
+    mismatches = []
+    seen = set()
+    for row in stored.values("agent_id", "date", *zero):
+        key = (row["agent_id"], row["date"])
+        seen.add(key)
+        expected = stats.get(key, zero)
+        for field in zero:
+            if row[field] != expected[field]:
+                mismatches.append((key[0], key[1], field, row[field], expected[field]))
+    for key, expected in stats.items():
+        if key in seen:
+            continue
+        for field, value in expected.items():
+            if value:
+                mismatches.append((key[0], key[1], field, 0, value))
+    return mismatches
+
+
+def stats_for(agent, day=None):
+    """The agent's counters for ``day`` (an unsaved, all-zero row if nothing happened yet)."""
+    from .models import AgentDailyStats
+
+    day = day or date.today()
+    return AgentDailyStats.objects.filter(agent=agent, date=day).first() or AgentDailyStats(agent=agent, date=day)
+
+
+async def astats_for(agent, day=None):
+    """Async ``stats_for``."""
+    from .models import AgentDailyStats
+
+    day = day or date.today()
+    return await AgentDailyStats.objects.filter(agent=agent, date=day).afirst() or AgentDailyStats(agent=agent, date=day)
@@ -0,0 +1,137 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Customer, Loan, Repayment
+from .payments import record_payments_bulk
+
+# Rows committed just before a cursor was issued can carry an older
+# updated_at; re-sending a short window keeps them from being skipped.
+# Clients upsert by id, so the overlap is harmless.
+CURSOR_OVERLAP = timedelta(seconds=getattr(settings, "SYNC_CURSOR_OVERLAP_SECONDS", 60))
+
+CUSTOMER_FIELDS = (
+    "id", "name", "phone", "location", "national_id", "credit_score", "has_active_loan", "updated_at",
+)
+LOAN_FIELDS = (
+    "id", "customer_id", "principal_amount", "interest_rate", "total_due", "daily_payment",
+    "duration_days", "start_date", "end_date", "status", "last_paid_date", "days_paid",
+    "total_paid", "updated_at",
+)
+REPAYMENT_FIELDS = (
+    "id", "loan_id", "date", "amount_paid", "recorded_by_id", "idempotency_key", "updated_at",
+)
+
+
+def parse_cursor(value):
+    """Turn a cursor from ``changes_since`` back into a datetime (None for a full sync)."""
+    if not value:
+        return None
+    cursor = parse_datetime(value)
+    if cursor is None:
+        raise ValueError("Invalid sync cursor.")
+    return cursor
+
+
+def changes_since(agent_profile, since=None):
+    """
+    The agent's customers, loans and repayments changed since ``since``.
+
+    Each table is read with one query on its ``updated_at`` index. The returned
+    ``cursor`` is passed back on the next call.
+    """
+    cursor = timezone.now()
+    customers = Customer.objects.filter(agent=agent_profile)
+    loans = Loan.objects.filter(customer__agent=agent_profile)
+    repayments = Repayment.objects.filter(loan__customer__agent=agent_profile)
+    if since:
+        floor = since - CURSOR_OVERLAP
+        customers = customers.filter(updated_at__gte=floor)
+        loans = loans.filter(updated_at__gte=floor)
+        repayments = repayments.filter(updated_at__gte=floor)
+
+    return {
+        "cursor": cursor.isoformat(),
+        "agent": {
+            "amount_in_hand": agent_profile.amount_in_hand,
+            "updated_at": agent_profile.updated_at,
+        },
+        "customers": list(customers.order_by("id").values(*CUSTOMER_FIELDS)),
+        "loans": list(loans.order_by("id").values(*LOAN_FIELDS)),
+        "repayments": list(repayments.order_by("id").values(*REPAYMENT_FIELDS)),
+    }
+
+
+def _replay_result(index, repayment):
+    return {
+        "index": index,
+        "status": "duplicate",
+        "loan_id": repayment.loan_id,
+        "amount": str(repayment.amount_paid),
+        "date": repayment.date.isoformat(),
+        "repayment_id": repayment.pk,
+        "idempotency_key": repayment.idempotency_key,
+    }
+
+
+def _answer_stored(agent_profile, keys, results):
+    """Fill in ``results`` for keys already stored; return the indexes still to record."""
+    stored = Repayment.objects.filter(idempotency_key__in=keys.values()).in_bulk(field_name="idempotency_key")
+    fresh = []
+    for index, key in keys.items():
+        repayment = stored.get(key)
+        if repayment is None:
+            fresh.append(index)
+        elif repayment.recorded_by_id != agent_profile.pk:
+            results[index] = {"index": index, "status": "rejected", "error": "idempotency_key already used."}
+        else:
+            results[index] = _replay_result(index, repayment)
+    return fresh
+
+
+def sync_payments(agent_profile, entries, attempts=2):
+    """
+    Record payments queued offline, each carrying a client ``idempotency_key``.
+
+    Keys that were already stored are answered from the existing Repayment
+    without writing anything, so replaying an upload is a no-op.
+    """
+    results = [None] * len(entries)
+    keys, seen = {}, set()
+    for index, entry in enumerate(entries):
+        key = entry.get("idempotency_key") if isinstance(entry, dict) else None
+        if not isinstance(key, str) or not 0 < len(key) <= 64:
+            results[index] = {"index": index, "status": "rejected", "error": "Missing or invalid idempotency_key."}
+        elif key in seen:
+            results[index] = {"index": index, "status": "rejected", "error": "idempotency_key repeated in this upload."}
+        else:
+            keys[index] = key
+            seen.add(key)
+
+    for _ in range(attempts):
+        fresh = _answer_stored(agent_profile, keys, results)
+        if not fresh:
+            return results
+        try:
+            recorded = record_payments_bulk(agent_profile, [entries[index] for index in fresh])
+        except IntegrityError:
+            # Another upload of the same keys won the race; its rows are replays now
+            continue
+
+        for index, result in zip(fresh, recorded):
+            result["index"] = index
+            result["idempotency_key"] = keys[index]
+            results[index] = result
+        return results
+
+    # Lost the race on every attempt: answer what is stored now, and ask for the rest again
+    for index in _answer_stored(agent_profile, keys, results):
+        results[index] = {
+            "index": index, "status": "rejected", "error": "Payment not recorded; upload it again.",
+            "idempotency_key": keys[index],
+        }
+    return results
+
@@ -0,0 +1,208 @@
+import random
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Sum
+
+from accounts.models import AgentProfile
+from .admin_totals import invalidate_totals
+from .business_days import get_calendar
+from .lifecycle import status_for
+from .models import CashLedgerEntry, Customer, Loan, LoanInstallment, LoanSettings, Repayment
+from .pricing import price
+from .schedule import allocate_payment, build_installments
+from .scoring import get_rules
+from .stats import rebuild_stats
+
+LOCATIONS = ("Mbabane", "Manzini", "Matsapha", "Nhlangano", "Siteki", "Piggs Peak", "Big Bend", "Lobamba")
+FIRST_NAMES = (
+    "Sipho", "Thandiwe", "Nomsa", "Bongani", "Lindiwe", "Sibusiso", "Zanele", "Mandla",
+    "Nokuthula", "Themba", "Ayanda", "Musa", "Phindile", "Sandile", "Busisiwe", "Vusi",
+)
+SURNAMES = (
+    "Dlamini", "Simelane", "Nxumalo", "Mamba", "Shongwe", "Magagula", "Mkhabela", "Motsa",
+    "Hlophe", "Zwane", "Msibi", "Ginindza", "Kunene", "Masilela", "Tsabedze", "Vilakati",
+)
+# (interest %, days), as offered by LoanOfferView
+OFFERS = ((Decimal("20"), 20), (Decimal("25"), 25))
+
+
+def usernames(seed):
+    """``(agent username prefix, admin username)`` for a generated data set."""
+    return f"synth{seed}-agent", f"synth{seed}-admin"
+
+
+class Generator:
+    def __init__(self, seed, days, today=None):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.today = today or date.today()
+        self.first_day = self.today - timedelta(days=days)
+        self.calendar = get_calendar()
+        self.rules = get_rules()
+        settings = LoanSettings.objects.first()
+        self.min_amount = int(settings.min_loan_amount) if settings else 200
+        self.max_amount = int(settings.max_loan_amount) if settings else 500
+        self.customer_number = 0
+
+    def customer(self, agent):
+        rng = self.rng
+        self.customer_number += 1
+        customer = Customer(
+            agent=agent,
+            name=f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)}",
+            phone=f"76{rng.randrange(10 ** 6):06d}",
+            location=rng.choice(LOCATIONS),
+            national_id=f"S{self.seed}-{self.customer_number:07d}",
+        )
+        customer.normalize_search_fields()
+        return customer
+
+    def history(self, customer):
+        """
+        Simulate the customer's loans back to back from a random start day.
+
+        Returns ``[(loan, installments, repayments)]``; the customer's score and
+        has_active_loan are updated along the way.
+        """
+        rng = self.rng
+        reliability = rng.betavariate(8, 2)  # share of business days the customer pays
+        start = self.calendar.next_business_day(self.first_day + timedelta(days=rng.randrange((self.today - self.first_day).days or 1)))
+        loans = []
+        while start < self.today:
+            interest, duration = rng.choice(OFFERS)
+            ceiling = max(self.min_amount, min(self.max_amount, customer.credit_score))
+            principal = Decimal(rng.randrange(self.min_amount, ceiling + 1, 50))
+            total_due, daily_payment, _ = price(principal, interest, duration)
+            loan = Loan(
+                customer=customer,
+                principal_amount=principal,
+                interest_rate=interest,
+                total_due=total_due,
+                daily_payment=daily_payment,
+                duration_days=duration,
+                start_date=start,
+                end_date=start + timedelta(days=duration),
+            )
+            installments = build_installments(loan, self.calendar)
+            repayments = []
+            # Payers keep going past the schedule until paid off or they give up
+            give_up = installments[-1].due_date + timedelta(days=rng.choice((15, 45, 90)))
+            for day in self.calendar.business_days(start, min(self.today - timedelta(days=1), give_up)):
+                if rng.random() > reliability:
+                    continue
+                amount = loan.daily_payment * (2 if rng.random() < 0.05 else 1)
+                amount = min(amount, loan.total_due - loan.total_paid)
+                repayments.append(Repayment(loan=loan, date=day, amount_paid=amount, recorded_by=customer.agent))
+                allocate_payment(installments, amount, day)
+                loan.total_paid += amount
+                loan.days_paid += 1
+                loan.last_paid_date = day
+                if loan.total_paid >= loan.total_due:
+                    break
+
+            loan.final_due = installments[-1].due_date
+            loan.status = status_for(loan, self.today)
+            loans.append((loan, installments, repayments))
+            if loan.status != "completed":
+                customer.has_active_loan = True
+                break
+
+            late = sum(1 for installment in installments if installment.paid_on and installment.paid_on > installment.due_date)
+            days_early = (loan.end_date - loan.last_paid_date).days
+            customer.credit_score = self.rules.apply(customer.credit_score, late, days_early)
+            loan.credit_scored = True
+            if rng.random() > 0.75:  # most customers come back for another loan
+                break
+            start = self.calendar.next_business_day(loan.last_paid_date + timedelta(days=rng.randint(1, 10)))
+        return loans
+
+
+def _write_batch(batch, agents):
+    customers = [customer for customer, _ in batch]
+    Customer.objects.bulk_create(customers)
+    histories = [entry for _, history in batch for entry in history]
+    Loan.objects.bulk_create([loan for loan, _, _ in histories])
+    LoanInstallment.objects.bulk_create(
+        [installment for _, installments, _ in histories for installment in installments], batch_size=2000
+    )
+    repayments = Repayment.objects.bulk_create(
+        [repayment for _, _, repayments in histories for repayment in repayments], batch_size=2000
+    )
+
+    entries = []
+    for loan, _, _ in histories:
+        entries.append(CashLedgerEntry(agent=loan.customer.agent, amount=-loan.principal_amount, kind="disbursement", loan=loan))
+    for repayment in repayments:
+        entries.append(CashLedgerEntry(agent=repayment.recorded_by, amount=repayment.amount_paid, kind="collection",
+                                       loan=repayment.loan, repayment=repayment))
+    CashLedgerEntry.objects.bulk_create(entries, batch_size=2000)
+    for entry in entries:
+        agents[entry.agent_id] += entry.amount
+    return len(histories), len(repayments)
+
+
+def generate(agents=10, customers_per_agent=50, days=180, seed=1, password="synthetic", batch_size=500, log=None):
+    """
+    Create ``agents`` agents with about ``customers_per_agent`` customers each
+    and ``days`` of loan and repayment history; the same ``seed`` gives the same data.
+
+    Rows go in with bulk_create, so what save() would do is done here: schedules
+    on the business calendar, cash ledger entries and a stats rebuild at the end.
+    Returns counts of the rows written.
+    """
+    log = log or (lambda message: None)
+    generator = Generator(seed, days)
+    agent_prefix, admin_username = usernames(seed)
+    hashed = make_password(password)  # hashing once keeps thousands of users fast
+
+    with transaction.atomic():
+        users = User.objects.bulk_create(
+            [User(username=f"{agent_prefix}{number}", first_name="Agent", last_name=str(number), password=hashed)
+             for number in range(1, agents + 1)]
+            + [User(username=admin_username, is_staff=True, password=hashed)]
+        )
+        # bulk_create skips the post_save signal that normally creates profiles
+        profiles = AgentProfile.objects.bulk_create([AgentProfile(user=user) for user in users[:-1]])
+
+    balances = {profile.pk: Decimal("0") for profile in profiles}
+    counts = {"agents": agents, "customers": 0, "loans": 0, "repayments": 0}
+    batch = []
+    for profile in profiles:
+        for _ in range(max(1, round(generator.rng.gauss(customers_per_agent, customers_per_agent / 4)))):
+            customer = generator.customer(profile)
+            batch.append((customer, generator.history(customer)))
+            if len(batch) >= batch_size:
+                with transaction.atomic():
+                    loans, repayments = _write_batch(batch, balances)
+                counts["customers"] += len(batch)
+                counts["loans"] += loans
+                counts["repayments"] += repayments
+                log(f"{counts['customers']} customers, {counts['loans']} loans, {counts['repayments']} repayments")
+                batch = []
+    if batch:
+        with transaction.atomic():
+            loans, repayments = _write_batch(batch, balances)
+        counts["customers"] += len(batch)
+        counts["loans"] += loans
+        counts["repayments"] += repayments
+
+    with transaction.atomic():
+        # Each agent was topped up with the float they lent out, so what remains is what they collected
+        lent = dict(
+            CashLedgerEntry.objects.filter(agent__in=profiles, kind="disbursement")
+            .values("agent").annotate(total=Sum("amount")).values_list("agent", "total")
+        )
+        CashLedgerEntry.objects.bulk_create([
+            CashLedgerEntry(agent_id=agent_id, amount=-total, kind="topup") for agent_id, total in lent.items()
+        ])
+        for profile in profiles:
+            profile.amount_in_hand = balances[profile.pk] - lent.get(profile.pk, 0)
+        AgentProfile.objects.bulk_update(profiles, ["amount_in_hand"])
+    log("Rebuilding daily stats")
+    rebuild_stats(generator.first_day)
+    invalidate_totals()
+    return counts
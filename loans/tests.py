@@ -1,3 +1,343 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import warnings
+from datetime import date, timedelta
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import AgentProfile
+
+from .business_days import get_calendar
+from .ledger import post_entry
+from .lifecycle import score_loans, unscored_loans
+from .models import CashLedgerEntry, Customer, Loan, LoanInstallment, LoanProduct, PublicHoliday, Repayment
+from .payments import record_payments_bulk
+from .pricing import get_catalog
+from .replicas import PIN_COOKIE, ReplicaPinMiddleware, primary, read_from_replica
+from .scoring import get_rules
+from .search import FTS_TABLE, _sqlite_fts_available, search_customers
+from .stats import verify_stats
+from .sync import sync_payments
+
+
+def customer_names():
+    return set(Customer.objects.values_list("name", flat=True))
+
+
+def names_view(request):
+    return HttpResponse(",".join(sorted(customer_names())))
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    """
+    loans.replicas against two SQLite files standing in for a primary and its
+    replica. Both start as copies of one migrated database; each test then adds
+    a customer that exists on only one of them, so a read shows where it went.
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = Path(tempfile.mkdtemp())
+        cls.template = cls.tmpdir / "template.sqlite3"
+        databases = {
+            alias: {"ENGINE": "django.db.backends.sqlite3", "NAME": str(cls.tmpdir / f"{alias}.sqlite3")}
+            for alias in ("default", "replica")
+        }
+        # The router looks for the replica in settings.DATABASES; the connections
+        # are swapped by hand below, which is what Django warns about here
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cls.settings_override = override_settings(DATABASES=databases)
+            cls.settings_override.enable()
+
+        cls.saved_settings = dict(connections.settings)
+        cls.saved_connections = {alias: connections[alias] for alias in connections}
+        for alias in cls.saved_connections:
+            del connections[alias]
+        connections.settings.clear()
+        connections.settings.update(connections.configure_settings(databases))
+
+        call_command("migrate", database="default", verbosity=0)
+        admin = User.objects.create_user("admin", password="x", is_staff=True)
+        agent = AgentProfile.objects.get(user=User.objects.create_user("agent", password="x"))
+        Customer.objects.create(agent=agent, name="Shared", phone="0700000000", national_id="shared")
+        cls.admin_id, cls.agent_id = admin.pk, agent.pk
+        connections["default"].close()
+        shutil.copy(databases["default"]["NAME"], cls.template)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections.close_all()
+        for alias in list(connections):
+            del connections[alias]
+        connections.settings.clear()
+        connections.settings.update(cls.saved_settings)
+        for alias, connection in cls.saved_connections.items():
+            connections[alias] = connection
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            cls.settings_override.disable()
+        shutil.rmtree(cls.tmpdir)
+
+    def setUp(self):
+        connections.close_all()
+        for alias in ("default", "replica"):
+            shutil.copy(self.template, connections.settings[alias]["NAME"])
+        for alias in ("default", "replica"):
+            Customer.objects.using(alias).create(
+                agent_id=self.agent_id, name=f"Only on {alias}", phone="0711111111", national_id=alias,
+            )
+
+    def serve(self, view, method="get", cookies=None):
+        request = getattr(RequestFactory(), method)("/")
+        request.COOKIES.update(cookies or {})
+        return ReplicaPinMiddleware(view)(request)
+
+    def test_replica_view_reads_the_replica(self):
+        response = self.serve(read_from_replica(names_view))
+        self.assertEqual(response.content, b"Only on replica,Shared")
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_other_views_read_the_primary(self):
+        self.assertEqual(self.serve(names_view).content, b"Only on default,Shared")
+
+    def test_write_pins_later_reads_to_the_primary(self):
+        client = Client()
+        client.force_login(User.objects.get(pk=self.admin_id))
+        listing = reverse("loans:admin_customers")
+        self.assertContains(client.get(listing), "Only on replica")
+
+        shared = Customer.objects.get(name="Shared")
+        response = client.post(reverse("loans:admin_edit_customer", args=[shared.pk]), {"name": "Renamed"})
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        pinned = client.get(listing)
+        self.assertContains(pinned, "Only on default")
+        self.assertContains(pinned, "Renamed")
+        self.assertNotContains(pinned, "Only on replica")
+
+    def test_unsafe_method_pins_without_a_write(self):
+        response = self.serve(read_from_replica(names_view), method="post")
+        self.assertEqual(response.content, b"Only on default,Shared")
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_pin_cookie_reads_the_primary(self):
+        response = self.serve(read_from_replica(names_view), cookies={PIN_COOKIE: "1"})
+        self.assertEqual(response.content, b"Only on default,Shared")
+
+    def test_logins_and_sessions_read_the_primary(self):
+        # A user and session the replica hasn't seen yet
+        user = User.objects.create_user("new-admin", password="x", is_staff=True)
+        client = Client()
+        client.force_login(user)
+        self.assertFalse(User.objects.using("replica").filter(pk=user.pk).exists())
+
+        response = client.get(reverse("loans:admin_customers"))
+        self.assertContains(response, "Only on replica")
+
+    def test_reads_in_a_transaction_stay_on_the_primary(self):
+        def view(request):
+            with transaction.atomic():
+                return names_view(request)
+
+        self.assertEqual(self.serve(read_from_replica(view)).content, b"Only on default,Shared")
+
+    def test_streamed_response_reads_the_replica_while_iterating(self):
+        def view(request):
+            def rows():
+                # Runs only when the body is read, after the middleware has returned
+                for name in Customer.objects.order_by("name").values_list("name", flat=True):
+                    yield f"{name}\n"
+
+            return StreamingHttpResponse(rows())
+
+        response = self.serve(read_from_replica(view))
+        self.assertEqual(b"".join(response.streaming_content), b"Only on replica\nShared\n")
+
+    def test_csv_export_reads_the_replica(self):
+        client = Client()
+        client.force_login(User.objects.get(pk=self.admin_id))
+        response = client.get(reverse("loans:admin_exports"), {"kind": "customers"})
+        body = b"".join(response.streaming_content)
+        self.assertIn(b"Only on replica", body)
+        self.assertNotIn(b"Only on default", body)
+
+    def test_search_checks_the_database_it_runs_on(self):
+        # A replica without the full-text table falls back to plain matching
+        with connections["replica"].cursor() as cursor:
+            cursor.execute(f"DROP TABLE {FTS_TABLE}")
+        _sqlite_fts_available.cache_clear()
+        self.addCleanup(_sqlite_fts_available.cache_clear)
+
+        def view(request):
+            agent = AgentProfile.objects.get(pk=self.agent_id)
+            return HttpResponse(",".join(customer.name for customer in search_customers(agent, name="only")))
+
+        self.assertEqual(self.serve(read_from_replica(view)).content, b"Only on replica")
+
+    def test_primary_forces_the_primary(self):
+        def view(request):
+            with primary():
+                on_primary = customer_names()
+            return HttpResponse(f"{sorted(on_primary)} {sorted(customer_names())}")
+
+        response = self.serve(read_from_replica(view))
+        self.assertEqual(response.content, b"['Only on default', 'Shared'] ['Only on replica', 'Shared']")
+
+
+class CustomerAgentChangeTests(TestCase):
+    def setUp(self):
+        self.agent, self.other_agent = (
+            AgentProfile.objects.get(user=User.objects.create_user(username, password="x"))
+            for username in ("agent", "other-agent")
+        )
+        self.customer = Customer.objects.create(agent=self.agent, name="Thandi", phone="0700000000", national_id="1")
+        Loan.objects.create(customer=self.customer, principal_amount=1000, status="active")
+
+    def test_save_moves_expected_collections(self):
+        customer = Customer.objects.get(pk=self.customer.pk)
+        customer.agent = self.other_agent
+        customer.save()
+        self.assertEqual(verify_stats(), [])
+
+    def test_admin_change_moves_expected_collections(self):
+        client = Client()
+        client.force_login(User.objects.create_superuser("admin", password="x"))
+        response = client.post(reverse("admin:loans_customer_change", args=[self.customer.pk]), {
+            "agent": self.other_agent.pk,
+            "name": "Thandi",
+            "phone": "0700000000",
+            "national_id": "1",
+            "credit_score": 500,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Customer.objects.get(pk=self.customer.pk).agent, self.other_agent)
+        self.assertEqual(verify_stats(), [])
+
+
+class BulkPaymentTests(TestCase):
+    def setUp(self):
+        self.agent = AgentProfile.objects.get(user=User.objects.create_user("agent", password="x"))
+        customer = Customer.objects.create(agent=self.agent, name="Thandi", phone="0700000000", national_id="1")
+        self.loan = Loan.objects.create(
+            customer=customer, principal_amount=1000, status="active", start_date=date.today() - timedelta(days=5),
+        )
+
+    def assertRejected(self, entry, error):
+        count = Repayment.objects.count()
+        [result] = record_payments_bulk(self.agent, [{"loan_id": self.loan.pk, **entry}])
+        self.assertEqual(result["status"], "rejected")
+        self.assertIn(error, result["error"])
+        self.assertEqual(Repayment.objects.count(), count)
+
+    def test_rejects_amounts_that_do_not_fit_the_column(self):
+        self.assertRejected({"amount": "99999999999"}, "Invalid payment amount")
+        self.assertRejected({"amount": "10.005"}, "Invalid payment amount")
+        self.assertRejected({"amount": "0"}, "Invalid payment amount")
+        self.assertRejected({"amount": "NaN"}, "Invalid payment amount")
+
+    def test_rejects_more_than_the_remaining_balance(self):
+        self.assertRejected({"amount": str(self.loan.total_due + 1)}, "remaining balance")
+
+    def test_rejects_dates_before_the_loan_starts(self):
+        self.assertRejected({"date": (self.loan.start_date - timedelta(days=1)).isoformat()}, "before the loan starts")
+
+    def test_default_amount_is_capped_at_the_remaining_balance(self):
+        Loan.objects.filter(pk=self.loan.pk).update(total_paid=self.loan.total_due - Decimal("1.00"))
+        [result] = record_payments_bulk(self.agent, [{"loan_id": self.loan.pk}])
+        self.assertEqual((result["status"], result["amount"]), ("recorded", "1.00"))
+        self.assertEqual(Loan.objects.get(pk=self.loan.pk).status, "completed")
+
+    def test_rejects_idempotency_keys_repeated_or_already_stored(self):
+        client = Client()
+        client.force_login(self.agent.user)
+        response = client.post(reverse("loans:bulk_mark_payment"), {"payments": [
+            {"loan_id": self.loan.pk, "date": date.today().isoformat(), "idempotency_key": "k1"},
+            {"loan_id": self.loan.pk, "date": (date.today() - timedelta(days=1)).isoformat(), "idempotency_key": "k1"},
+        ]}, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([result["status"] for result in response.json()["results"]], ["recorded", "rejected"])
+
+        self.assertRejected(
+            {"date": (date.today() - timedelta(days=2)).isoformat(), "idempotency_key": "k1"}, "already used",
+        )
+
+    def test_sync_answers_a_lost_race_instead_of_raising(self):
+        entries = [{"loan_id": self.loan.pk, "idempotency_key": "k1"}]
+        with mock.patch("loans.sync.record_payments_bulk", side_effect=IntegrityError):
+            [result] = sync_payments(self.agent, entries)
+        self.assertEqual((result["status"], result["idempotency_key"]), ("rejected", "k1"))
+
+
+class LoanScoringTests(TestCase):
+    def test_scoring_counts_installments_paid_late(self):
+        agent = AgentProfile.objects.get(user=User.objects.create_user("agent", password="x"))
+        customer = Customer.objects.create(agent=agent, name="Thandi", phone="0700000000", national_id="1")
+        loan = Loan.objects.create(customer=customer, principal_amount=1000, start_date=date(2025, 1, 1))
+        installments = list(loan.installments.order_by("number"))
+        for installment in installments:
+            installment.amount_paid, installment.paid_on = installment.amount_due, installment.due_date
+        installments[0].paid_on += timedelta(days=1)
+        LoanInstallment.objects.bulk_update(installments, ["amount_paid", "paid_on"])
+        Loan.objects.filter(pk=loan.pk).update(
+            status="completed", total_paid=loan.total_due, last_paid_date=installments[-1].due_date,
+        )
+
+        [unscored] = unscored_loans()
+        self.assertEqual(unscored.installments_late, 1)
+        self.assertEqual(unscored.days_missed, 0)  # nothing is left unpaid
+
+        score_loans([unscored])
+        days_early = (unscored.end_date - unscored.last_paid_date).days
+        self.assertEqual(Customer.objects.get(pk=customer.pk).credit_score, get_rules().apply(500, 1, days_early))
+
+
+class CashLedgerAdminTests(TestCase):
+    def test_entries_cannot_be_changed_or_deleted_from_the_admin(self):
+        agent = AgentProfile.objects.get(user=User.objects.create_user("agent", password="x"))
+        entry = post_entry(agent, Decimal("100.00"), "opening")
+        client = Client()
+        client.force_login(User.objects.create_superuser("admin", password="x"))
+
+        change_url = reverse("admin:loans_cashledgerentry_change", args=[entry.pk])
+        self.assertEqual(client.get(change_url).status_code, 200)
+        self.assertEqual(client.post(change_url, {"amount": "5.00", "kind": "opening"}).status_code, 403)
+        client.post(reverse("admin:loans_cashledgerentry_changelist"), {
+            "action": "delete_selected", "_selected_action": [entry.pk], "post": "yes",
+        })
+        self.assertEqual(client.get(reverse("admin:loans_cashledgerentry_add")).status_code, 403)
+
+        self.assertEqual(CashLedgerEntry.objects.get().amount, Decimal("100.00"))
+        agent.refresh_from_db()
+        self.assertEqual(agent.amount_in_hand, Decimal("100.00"))
+
+
+class CatalogInvalidationTests(TestCase):
+    def test_catalog_reloads_once_the_change_commits(self):
+        catalog = get_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            product = LoanProduct.objects.create(name="Weekly", interest_rate=15, duration_days=30)
+            # Until the commit another request could reload the old rows under a new version
+            self.assertIs(get_catalog(), catalog)
+        self.assertIn(product, get_catalog().products)
+
+
+class CalendarInvalidationTests(TestCase):
+    def test_calendar_reloads_once_the_change_commits(self):
+        calendar = get_calendar()
+        with self.captureOnCommitCallbacks(execute=True):
+            PublicHoliday.objects.create(name="Founders' Day", holiday_date=date(2031, 6, 2))
+            self.assertIs(get_calendar(), calendar)
+        self.assertIn(date(2031, 6, 2), get_calendar().holidays)
@@ -1,23 +1,43 @@
 from django.urls import path
-from .views import AgentDashboardView, MarkPaymentView,LoanQualificationView,LoanOfferView
+from .views import MarkPaymentView,LoanQualificationView,LoanOfferView
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 app_name = "loans"  # 
 
+# Under ASGI the read-heavy pages are served by their async versions
+if settings.ASGI:
+    AgentDashboardView = async_views.AsyncAgentDashboardView
+    AdminDashboardView = async_views.AsyncAdminDashboardView
+    CustomerHistoryView = async_views.AsyncCustomerHistoryView
+else:
+    AgentDashboardView = views.AgentDashboardView
+    AdminDashboardView = views.AdminDashboardView
+    CustomerHistoryView = views.CustomerHistoryView
+
 urlpatterns = [
     path('dashboard/', AgentDashboardView.as_view(), name='agent_dashboard'),
     path('mark-payment/<int:loan_id>/', MarkPaymentView.as_view(), name='mark_payment'),
+    path('mark-payment/bulk/', views.BulkPaymentView.as_view(), name='bulk_mark_payment'),
+    path('sync/changes/', views.SyncChangesView.as_view(), name='sync_changes'),
+    path('sync/payments/', views.SyncPaymentsView.as_view(), name='sync_payments'),
     path("customers/", views.CustomerListView.as_view(), name="list_customers"),
+    path("customers/search/", views.CustomerSearchView.as_view(), name="customer_search"),
     path("customers/new-loan/", views.CreateCustomerAndLoanView.as_view(), name="create_customer_loan"),
     path("customers/add-loan/", views.AddLoanExistingCustomerView.as_view(), name="add_loan_existing_customer"),
     path("customer/<int:customer_id>/qualification/", LoanQualificationView.as_view(), name="loan_qualification"),
     path("customer/<int:customer_id>/offer/", LoanOfferView.as_view(), name="loan_offer"),
     # loans/urls.py
-    path('customer/<int:customer_id>/history/', views.CustomerHistoryView.as_view(), name='customer_history'),
-    path("admin/dashboard/", views.AdminDashboardView.as_view(), name="admin_dashboard"),
+    path('customer/<int:customer_id>/history/', CustomerHistoryView.as_view(), name='customer_history'),
+    path('customer/<int:customer_id>/history/events/', views.CustomerHistoryEventsView.as_view(), name='customer_history_events'),
+    path("admin/dashboard/", AdminDashboardView.as_view(), name="admin_dashboard"),
     path("admin/customer/<int:customer_id>/adjust_credit/", views.AdjustCustomerCreditView.as_view(), name="adjust_customer_credit"),
     path("admin/update_loan_settings/", views.UpdateLoanSettingsView.as_view(), name="update_loan_settings"),
+    path("admin/profiler/", views.AdminProfilerView.as_view(), name="admin_profiler"),
+    path("admin/imports/", views.AdminImportView.as_view(), name="admin_import"),
+    path("admin/exports/", views.AdminExportView.as_view(), name="admin_exports"),
+    path("admin/reports/par/", views.AdminPortfolioReportView.as_view(), name="admin_par_report"),
     path("admin/customers/", views.AdminCustomerListView.as_view(), name="admin_customers"),
     path("admin/customers/<int:pk>/edit/", views.AdminCustomerEditView.as_view(), name="admin_edit_customer"),
     path('admin/agents/', views.AdminAgentsView.as_view(), name='admin_agents'),
@@ -1,13 +1,6 @@
 from datetime import date
-from .models import Customer, Repayment
+from .stats import stats_for
 
-def agent_performance(agent):
-    total_customers = Customer.objects.filter(agent=agent).count()
-    paid_today = Repayment.objects.filter(
-        recorded_by=agent.user,
-        date=date.today()
-    ).values('loan__customer').distinct().count()
-
-    if total_customers == 0:
-        return 0
-    return round((paid_today / total_customers) * 100, 2)
+def agent_performance(agent, day=None):
+    """Share of the agent's loans expected on ``day`` that were collected."""
+    return stats_for(agent, day or date.today()).loan_collection_percentage
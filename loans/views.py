@@ -1,12 +1,35 @@
 from django.views import View
 from django.views.generic import TemplateView
 from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+import csv
+import io
+import json
+import secrets
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
+from django.db import IntegrityError
 from datetime import date
 
 from .models import Customer, Loan, Repayment
 from .utils import agent_performance
+from .dashboard import agent_collection_summary
+from .payments import MAX_BATCH_SIZE, PaymentError, record_payment, record_payments_bulk
+from .sync import changes_since, parse_cursor, sync_payments
+from .search import search_customers, typeahead
+from .pagination import InvalidCursor, KeysetPaginator, cursor_url, per_page_from
+from .ledger import post_entry
+from .pricing import get_catalog
+from .schedule import CENT
+from .admin_totals import get_totals
+from . import profiler
+from .profiler import clear_samples, recent_samples, view_summaries
+from .metrics import render_metrics
+from .exports import EXPORTS, csv_chunks, export_filename, export_rows, parse_filters
+from .imports import OPTIONAL_COLUMNS, REQUIRED_COLUMNS, ImportFileError, import_customers
+from .reports import GROUPINGS, PAR_THRESHOLDS, par_csv_rows, portfolio_at_risk
+from .replicas import read_from_replica
 from accounts.models import AgentProfile
 
 from django.shortcuts import get_object_or_404, render
@@ -20,26 +43,9 @@ class AgentDashboardView(View):
 
     def get(self, request, *args, **kwargs):
         agent_profile = get_object_or_404(AgentProfile, user=request.user)
-        loans = Loan.objects.filter(customer__agent=agent_profile, status='active')
-
-        # Loans due today
-        due_loans = [loan for loan in loans if loan.is_due_today]
-
-        # Calculate amount collected and loans collected
-        amount_to_collect = sum(loan.daily_payment for loan in loans)
-        amount_collected = 0
-        loans_collected_count = 0
 
-        today = date.today()
-        for loan in loans:
-            lactual_loan = Repayment.objects.filter(loan=loan,date=today).first()
-            if lactual_loan:
-               amount_collected += lactual_loan.amount_paid
-               loans_collected_count += 1
-
-        total_due_loans = len(loans)
-        loan_collection_percentage = round((loans_collected_count / total_due_loans) * 100, 2) if total_due_loans else 0
-        amount_collection_percentage = round((amount_collected / amount_to_collect) * 100, 2) if amount_to_collect else 0
+        # Collection metrics come from a fixed number of aggregate queries
+        summary = agent_collection_summary(agent_profile)
 
         # Handle customer search
         name_query = request.GET.get("name", "").strip()
@@ -49,32 +55,16 @@ class AgentDashboardView(View):
 
         if name_query or phone_query:
             searched = True
-            customers = Customer.objects.filter(agent=agent_profile)
-            if name_query:
-                customers = customers.filter(name__icontains=name_query)
-            if phone_query:
-                customers = customers.filter(phone__icontains=phone_query)
-
-        # Daily performance: how many due loans are already paid today
-        paid_today = len(loans) - len(due_loans)
-        performance = round((paid_today / len(loans)) * 100, 2) if loans else 0
+            customers = search_customers(agent_profile, name=name_query, phone=phone_query)
 
         amount_in_hand = agent_profile.amount_in_hand
 
         self.context = {
             "agent": agent_profile,
             "amount_in_hand": amount_in_hand, 
-            "loans": loans,
-            "due_loans": due_loans,
-            "performance": performance,
             "customers": customers,
             "searched": searched,
-            "amount_to_collect": amount_to_collect,
-            "amount_collected": amount_collected,
-            "amount_collection_percentage": amount_collection_percentage,
-            "loans_collected_count": loans_collected_count,
-            "total_due_loans": total_due_loans,
-            "loan_collection_percentage": loan_collection_percentage,
+            **summary,
         }
         return render(request, self.template_name, self.context)
 
@@ -90,51 +80,179 @@ class MarkPaymentView(LoginRequiredMixin, View):
 
         # Validate payment amount
         try:
-            amount = Decimal(amount) if amount else loan.daily_payment
+            amount = Decimal(amount) if amount else min(loan.daily_payment, loan.remaining_balance)
         except:
             messages.error(request, "Invalid payment amount.")
             return redirect("loans:agent_dashboard")
 
-        # Prevent duplicate same-amount payments in same day
-        if loan.last_paid_date == today and amount == loan.daily_payment:
-            messages.warning(request, "Payment already recorded for today.")
+        # Duplicate-day and concurrent submits are caught under the loan's row lock
+        try:
+            repayment = record_payment(loan, agent_profile, amount, today)
+        except PaymentError as exc:
+            messages.warning(request, str(exc))
             return redirect("loans:agent_dashboard")
-        
-        Repayment.objects.create(
-            loan=loan,
-            date=today,
-            amount_paid=amount,
-            recorded_by=agent_profile
-
-        )   
-        # ✅ Update loan financials
-        loan.total_paid += amount
-        loan.last_paid_date = today
-        loan.days_paid += 1
-        agent_profile.amount_in_hand += amount
-        agent_profile.save()
-
-        # ✅ If total_paid >= total_due, mark loan as completed
-        if loan.remaining_balance <= 0:
-            loan.status = "completed"
-
-        loan.save()
 
         messages.success(
             request,
-            f"Payment of {amount} SZL recorded for {loan.customer.name}. Remaining balance: {loan.remaining_balance:.2f} SZL"
+            f"Payment of {amount} SZL recorded for {loan.customer.name}. Remaining balance: {repayment.loan.remaining_balance:.2f} SZL"
         )
         return redirect("loans:agent_dashboard")
     
+class BulkPaymentView(LoginRequiredMixin, View):
+    """
+    Record a whole route's collections in one request.
+
+    Expects a JSON body ``{"payments": [{"loan_id": 1, "amount": "12.00", "date": "2025-11-03"}, ...]}``
+    (``amount`` and ``date`` are optional, as in MarkPaymentView) and returns one
+    result per entry.
+    """
+
+    def post(self, request):
+        agent_profile = get_object_or_404(AgentProfile, user=request.user)
+        try:
+            payments = json.loads(request.body).get("payments")
+        except (ValueError, AttributeError):
+            return JsonResponse({"error": "Request body must be a JSON object."}, status=400)
+
+        if not isinstance(payments, list) or not payments:
+            return JsonResponse({"error": "'payments' must be a non-empty list."}, status=400)
+        if len(payments) > MAX_BATCH_SIZE:
+            return JsonResponse({"error": f"At most {MAX_BATCH_SIZE} payments per request."}, status=400)
+
+        try:
+            results = record_payments_bulk(agent_profile, payments)
+        except IntegrityError:
+            # A concurrent request stored one of the idempotency keys first
+            return JsonResponse({"error": "Some of these payments were just recorded; send the batch again."}, status=409)
+        recorded = sum(1 for result in results if result["status"] == "recorded")
+        return JsonResponse({
+            "recorded": recorded,
+            "rejected": len(results) - recorded,
+            "results": results,
+        })
+
+
+class SyncChangesView(LoginRequiredMixin, View):
+    """Delta download for offline devices: ``?cursor=`` from the previous response."""
+
+    def get(self, request):
+        agent_profile = get_object_or_404(AgentProfile, user=request.user)
+        try:
+            since = parse_cursor(request.GET.get("cursor"))
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+        return JsonResponse(changes_since(agent_profile, since))
+
+
+class SyncPaymentsView(LoginRequiredMixin, View):
+    """
+    Upload of payments queued offline. Same body as BulkPaymentView, but every
+    entry needs a client-generated ``idempotency_key`` so retries are no-ops.
+    """
+
+    def post(self, request):
+        agent_profile = get_object_or_404(AgentProfile, user=request.user)
+        try:
+            payments = json.loads(request.body).get("payments")
+        except (ValueError, AttributeError):
+            return JsonResponse({"error": "Request body must be a JSON object."}, status=400)
+
+        if not isinstance(payments, list) or not payments:
+            return JsonResponse({"error": "'payments' must be a non-empty list."}, status=400)
+        if len(payments) > MAX_BATCH_SIZE:
+            return JsonResponse({"error": f"At most {MAX_BATCH_SIZE} payments per request."}, status=400)
+
+        results = sync_payments(agent_profile, payments)
+        return JsonResponse({"results": results})
+
+
 # loans/views.py
-from django.views.generic import ListView
 from .models import Customer,LoanSettings
 from .forms import CustomerForm, LoanForm
 
-class CustomerListView(ListView):
-    model = Customer
+CUSTOMER_SORTS = {
+    "name": ("name", "id"),
+    "-name": ("-name", "-id"),
+    "credit": ("credit_score", "id"),
+    "-credit": ("-credit_score", "-id"),
+    "newest": ("-id",),
+    "oldest": ("id",),
+}
+
+
+def _filter_customers(customers, params):
+    """Apply the ``location``, ``band`` and ``active`` list filters."""
+    location = params.get("location", "").strip()
+    if location:
+        customers = customers.filter(location=location)
+    band = Customer.CREDIT_BANDS.get(params.get("band"))
+    if band:
+        low, high = band
+        customers = customers.filter(credit_score__gte=low)
+        if high is not None:
+            customers = customers.filter(credit_score__lte=high)
+    if params.get("active") in ("0", "1"):
+        customers = customers.filter(has_active_loan=params["active"] == "1")
+    return customers
+
+
+def _keyset_page(request, queryset, ordering):
+    """One page of ``queryset``; a stale or tampered cursor falls back to page one."""
+    paginator = KeysetPaginator(queryset, ordering, per_page=per_page_from(request))
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        page = paginator.page()
+    return {
+        "page": page,
+        "next_url": cursor_url(request, page.next_cursor) if page.has_next else None,
+        "previous_url": cursor_url(request, page.previous_cursor) if page.has_previous else None,
+    }
+
+
+class CustomerListView(LoginRequiredMixin, View):
+    """The agent's own customers, a page at a time."""
     template_name = "loans/customer_list.html"
-    context_object_name = "customers"
+
+    def get(self, request):
+        customers = _filter_customers(
+            Customer.objects.filter(agent__user=request.user).only("id", "name", "phone", "location", "credit_score"),
+            request.GET,
+        )
+        sort = request.GET.get("sort") if request.GET.get("sort") in CUSTOMER_SORTS else "name"
+        context = _keyset_page(request, customers, CUSTOMER_SORTS[sort])
+        context.update({
+            "customers": context["page"].object_list,
+            "sort": sort,
+            "credit_bands": Customer.CREDIT_BANDS,
+        })
+        return render(request, self.template_name, context)
+
+class CustomerSearchView(LoginRequiredMixin, View):
+    """JSON typeahead over the agent's customers: ``?q=`` name, phone or national ID."""
+
+    def get(self, request):
+        agent_profile = get_object_or_404(AgentProfile, user=request.user)
+        try:
+            limit = min(int(request.GET.get("limit", 10)), 50)
+        except ValueError:
+            limit = 10
+        customers = typeahead(agent_profile, request.GET.get("q", ""), limit=max(limit, 1))
+        return JsonResponse({
+            "results": [
+                {
+                    "id": customer.id,
+                    "name": customer.name,
+                    "phone": customer.phone,
+                    "national_id": customer.national_id,
+                    "location": customer.location,
+                    "loan_count": customer.loan_count,
+                    "history_url": reverse("loans:customer_history", args=[customer.id]),
+                    "qualification_url": reverse("loans:loan_qualification", args=[customer.id]),
+                }
+                for customer in customers
+            ]
+        })
 
 class CreateCustomerAndLoanView(View):
     template_name = "loans/create_customer_loan.html"
@@ -207,7 +325,7 @@ class LoanQualificationView(View):
             customer = get_object_or_404(Customer, id=customer_id)
 
             # Check if any active loan exists
-            active_loan = Loan.objects.filter(customer=customer, status='active').exists()
+            active_loan = Loan.objects.filter(customer=customer, status__in=Loan.OPEN_STATUSES).exists()
             if active_loan:
                 messages.warning(request, f"{customer.name} still has an active loan and cannot apply for another.")
                 return redirect('loans:agent_dashboard')
@@ -217,7 +335,7 @@ class LoanQualificationView(View):
             # New customer
             customer = None
             # Default ranges from LoanSettings (or any defaults you want)
-            settings = LoanSettings.objects.first()
+            settings = get_catalog().settings
             lower = settings.min_loan_amount if settings else 200
             upper = settings.max_loan_amount if settings else 500
 
@@ -230,32 +348,33 @@ class LoanQualificationView(View):
 
 
 # loans/views.py
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+
+def parse_offer_amount(value):
+    """``value`` rounded to the cent, or None unless it is a finite number."""
+    try:
+        amount = Decimal(value)
+        # NaN survives quantize() but can't be compared with a product's limits
+        return amount.quantize(CENT) if amount.is_finite() else None
+    except (TypeError, ValueError, InvalidOperation):
+        return None
+
 
 class LoanOfferView(View):
+    """Offers from the product catalog open to this customer at the chosen amount."""
     template_name = "loans/loan_offer.html"
 
     def get(self, request, customer_id):
         customer = get_object_or_404(Customer, id=customer_id)
+        catalog = get_catalog()
 
         # Default amount for new customer or passed via query param
-        amount = request.GET.get("amount", 200)
-        try:
-            amount = float(amount)
-        except ValueError:
-            amount = 200
-
-        offers = [
-            {"interest": 20, "days": 20},
-            {"interest": 25, "days": 25},
-        ]
-
-        # Calculate repayment details
-        for offer in offers:
-            total_due = amount + (amount * offer["interest"] / 100)
-            offer["total_due"] = round(total_due, 2)
-            offer["daily_payment"] = round(total_due / offer["days"], 2)
+        amount = parse_offer_amount(request.GET.get("amount", "200"))
+        if amount is None:
+            amount = Decimal("200")
 
+        offers = catalog.quote_table([amount], catalog.eligible(customer, amount))[amount]
         return render(request, self.template_name, {
             "customer": customer,
             "amount": amount,
@@ -265,93 +384,87 @@ class LoanOfferView(View):
     def post(self, request, customer_id):
         customer = get_object_or_404(Customer, id=customer_id)
         agent_profile = AgentProfile.objects.get(user=request.user)
-        interest = float(request.POST.get("interest"))
-        days = int(request.POST.get("days"))
-        amount = float(request.POST.get("amount"))
-
-        total_due = amount + (amount * interest / 100)
-        daily_payment = total_due / days
-
-        # ✅ Create the loan
-        Loan.objects.create(
-            customer=customer,
-            principal_amount=amount,
-            interest_rate=interest,
-            duration_days=days,
-            total_due=round(total_due, 2),
-            daily_payment=round(daily_payment, 2),
-            status='active'
-        )
-        agent_profile.amount_in_hand -= Decimal(amount)
-        agent_profile.save()
-
-        messages.success(request, f"Loan created successfully for {customer.name} ({amount} SZL at {interest}% for {days} days).")
+        catalog = get_catalog()
+        try:
+            product = catalog.by_id.get(int(request.POST.get("product")))
+        except (TypeError, ValueError):
+            product = None
+        amount = parse_offer_amount(request.POST.get("amount"))
+        if product is None or amount is None or product not in catalog.eligible(customer, amount):
+            messages.error(request, "That offer is not available for this customer and amount.")
+            return redirect("loans:loan_qualification", customer.id)
+
+        quote = catalog.quote(amount, product)
+
+        # ✅ Create the loan (its schedule and expected collections come with it)
+        with transaction.atomic():
+            loan = Loan.objects.create(
+                customer=customer,
+                product=product,
+                principal_amount=quote.amount,
+                interest_rate=product.interest_rate,
+                duration_days=product.duration_days,
+                total_due=quote.total_due,
+                daily_payment=quote.daily_payment,
+                status='active'
+            )
+            post_entry(agent_profile, -quote.amount, "disbursement", loan=loan)
+
+        messages.success(request, f"Loan created successfully for {customer.name} ({quote.amount} SZL, {product}).")
         return redirect("loans:agent_dashboard")
 
-from calendar import monthrange
-from datetime import date, timedelta
-from django.utils import timezone
-from .models import Customer, Loan, Repayment
-import json
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .history import customer_events, feed_version, parse_day
 
 class CustomerHistoryView(View):
+    """All of a customer's loans; the calendar loads its events from CustomerHistoryEventsView."""
     template_name = "loans/customer_history.html"
 
     def get(self, request, customer_id):
         customer = get_object_or_404(Customer, id=customer_id)
-        today = timezone.now().date()
-
-        loan = Loan.objects.filter(customer=customer).order_by('-start_date').first()
-        repayments = Repayment.objects.filter(loan=loan).order_by('date') if loan else []
-
-        events = []
-
-        if loan:
-            start_date = loan.start_date
-            end_date = loan.start_date + timedelta(days=loan.duration_days)
-            estimated_end_date = end_date #
-
-            for i in range((end_date - start_date).days + 1):
-                day = start_date + timedelta(days=i)
-
-                if day.weekday() >= 5:  # skip weekends
-                    continue
-
-                status = None
-                color = None
-                if day == loan.start_date:
-                    status = "Disbursed"
-                    color = "#2196F3"
-                elif any(r.date == day for r in repayments):
-                    status = "Paid"
-                    color = "green"
-                elif day < today:
-                    status = "Missed"
-                    color = "red"
-
-                if status:
-                    events.append({
-                        "title": status,
-                        "start": day.strftime("%Y-%m-%d"),
-                        "color": color
-                    })
+        # The schedule already skips weekends and holidays
+        loans = Loan.objects.filter(customer=customer).annotate(
+            estimated_end_date=Max("installments__due_date")
+        ).order_by("-start_date")
+        return render(request, self.template_name, {"customer": customer, "loans": loans})
+
+
+class CustomerHistoryEventsView(LoginRequiredMixin, View):
+    """
+    JSON calendar feed for a customer, ``?start=&end=`` optional. Responses
+    carry an ETag and Last-Modified so browsers revalidate with a 304.
+    """
+
+    def get(self, request, customer_id):
+        customer = get_object_or_404(Customer, id=customer_id)
+        try:
+            start = parse_day(request.GET.get("start"))
+            end = parse_day(request.GET.get("end"))
+        except ValueError:
+            return JsonResponse({"error": "start and end must be dates (YYYY-MM-DD)."}, status=400)
+
+        etag, last_modified = feed_version(customer)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = JsonResponse(customer_events(customer, start, end), safe=False)
+        response["ETag"] = etag
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        response["Cache-Control"] = "private, no-cache"
+        return response
 
-        context = {
-            "customer": customer,
-            "loan": loan,
-            "estimated_end_date": estimated_end_date, # <-- Add to context
-            "events_json": json.dumps(events),  # always valid JSON string
-        }
-        return render(request, self.template_name, context)
-    
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views import View
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.utils.decorators import method_decorator
 from datetime import date, timedelta
-from django.db.models import Sum, Count
-from .models import AgentProfile, Customer, Loan, Repayment, LoanSettings,AdminTransactionRequest
-from decimal import Decimal
+from django.utils import timezone
+from django.db.models import Avg, Count, Max, Sum
+from .models import AgentProfile, Customer, Loan, Repayment, LoanSettings,AdminTransactionRequest,AgentDailyStats, RequestProfile
+from decimal import Decimal, InvalidOperation
 
 class AdminRequiredMixin(UserPassesTestMixin):
     def test_func(self):
@@ -362,27 +475,162 @@ class AdminRequiredMixin(UserPassesTestMixin):
         raise PermissionDenied("You do not have permission to access this page.")
 
 
+@method_decorator(read_from_replica, name="dispatch")
 class AdminDashboardView(AdminRequiredMixin, View):
     def get(self, request):
 
-        # Global metrics
-        total_customers = Customer.objects.count()
-        total_loans = Loan.objects.count()
-        active_loans = Loan.objects.filter(status="active").count()
-        settings = LoanSettings.objects.first()
-        pending_requests = AdminTransactionRequest.objects.filter(status='pending').select_related('agent__user')
+        # Global counts, settings and pending requests, cached until one of them changes
+        totals = get_totals()
+
+        # Today's collections across all agents, summed from the daily rollup
+        collections_today = AgentDailyStats.objects.filter(date=date.today()).aggregate(
+            amount_expected=Sum("amount_expected"),
+            amount_collected=Sum("amount_collected"),
+        )
 
         context = {
-           
-            "total_customers": total_customers,
-            "total_loans": total_loans,
-            "active_loans": active_loans,
-            "loan_settings": settings,
-            "pending_requests": pending_requests,
+            **totals,
+            "amount_expected_today": collections_today["amount_expected"] or 0,
+            "amount_collected_today": collections_today["amount_collected"] or 0,
         }
         return render(request, "loans/admin_dashboard.html", context)
 
 
+@method_decorator(read_from_replica, name="dispatch")
+class AdminPortfolioReportView(AdminRequiredMixin, View):
+    """PAR1/PAR7/PAR30 by agent or location; ``?format=csv`` downloads it."""
+    template_name = "loans/admin_par.html"
+
+    def get(self, request):
+        group_by = request.GET.get("group") if request.GET.get("group") in GROUPINGS else "agent"
+        report = portfolio_at_risk(group_by, refresh=request.GET.get("refresh") == "1")
+
+        if request.GET.get("format") == "csv":
+            response = HttpResponse(content_type="text/csv")
+            response["Content-Disposition"] = f'attachment; filename="par-{group_by}-{report["day"]}.csv"'
+            csv.writer(response).writerows(par_csv_rows(report))
+            return response
+        return render(request, self.template_name, {"report": report, "thresholds": PAR_THRESHOLDS})
+
+
+@method_decorator(read_from_replica, name="dispatch")
+class AdminExportView(AdminRequiredMixin, View):
+    """
+    Export form; with ``?kind=`` streams that CSV, filtered by ``start``,
+    ``end``, ``agent`` and ``status``. ``gzip=1`` compresses it on the fly.
+    """
+    template_name = "loans/admin_exports.html"
+
+    def get(self, request):
+        kind = request.GET.get("kind")
+        if not kind:
+            return render(request, self.template_name, {
+                "kinds": EXPORTS,
+                "agents": AgentProfile.objects.select_related("user").only("id", "user__username").order_by("user__username"),
+                "statuses": Loan.OPEN_STATUSES + ("completed",),
+            })
+        try:
+            filters = parse_filters(kind, *(request.GET.get(key) for key in ("start", "end", "agent", "status")))
+        except ValueError as exc:
+            return HttpResponse(str(exc), status=400, content_type="text/plain")
+
+        compress = request.GET.get("gzip") == "1"
+        response = StreamingHttpResponse(
+            csv_chunks(export_rows(kind, **filters), compress=compress),
+            content_type="application/gzip" if compress else "text/csv",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{export_filename(kind, filters, compress)}"'
+        return response
+
+
+class AdminImportView(AdminRequiredMixin, View):
+    """Upload a CSV of customers, each with an optional opening loan; shows a row-level error report."""
+    template_name = "loans/admin_import.html"
+    MAX_ERRORS_SHOWN = 500
+
+    def context(self, **extra):
+        return {
+            "agents": AgentProfile.objects.select_related("user").only("id", "user__username").order_by("user__username"),
+            "required_columns": REQUIRED_COLUMNS,
+            "optional_columns": OPTIONAL_COLUMNS,
+            **extra,
+        }
+
+    def get(self, request):
+        return render(request, self.template_name, self.context())
+
+    def post(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            messages.error(request, "Choose a CSV file to import.")
+            return render(request, self.template_name, self.context())
+        default_agent = AgentProfile.objects.filter(pk=request.POST.get("agent") or None).first()
+        dry_run = request.POST.get("dry_run") == "1"
+
+        try:
+            result = import_customers(
+                io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline=""),
+                default_agent=default_agent,
+                dry_run=dry_run,
+            )
+        except (ImportFileError, UnicodeDecodeError, csv.Error) as exc:
+            messages.error(request, f"Could not read {upload.name}: {exc}")
+            return render(request, self.template_name, self.context())
+
+        summary = f"{result['customers']} customer(s) and {result['loans']} loan(s) from {result['rows']} row(s)"
+        if dry_run:
+            messages.info(request, f"Dry run: would import {summary}.")
+        else:
+            messages.success(request, f"Imported {summary}.")
+        return render(request, self.template_name, self.context(
+            result=result,
+            errors=result["errors"][:self.MAX_ERRORS_SHOWN],
+        ))
+
+
+class AdminProfilerView(AdminRequiredMixin, View):
+    """Sampled request timings per view: this process's ring buffer, plus stored samples if flushing is on."""
+    template_name = "loans/admin_profiler.html"
+
+    def get(self, request):
+        since = timezone.now() - timedelta(hours=24)
+        stored = RequestProfile.objects.filter(created_at__gte=since).values("view").annotate(
+            count=Count("id"),
+            avg_ms=Avg("total_ms"),
+            max_ms=Max("total_ms"),
+            avg_queries=Avg("queries"),
+            max_queries=Max("queries"),
+            avg_sql_ms=Avg("sql_ms"),
+        ).order_by("-avg_ms")
+        samples = recent_samples()
+        return render(request, self.template_name, {
+            "summaries": view_summaries(samples),
+            "slow_requests": sorted(samples, key=lambda sample: sample["total_ms"], reverse=True)[:20],
+            "stored": stored,
+            "sample_rate": profiler.SAMPLE_RATE,
+            "buffer_size": profiler.BUFFER_SIZE,
+        })
+
+    def post(self, request):
+        clear_samples()
+        messages.success(request, "Profiler samples cleared.")
+        return redirect("loans:admin_profiler")
+
+
+class MetricsView(View):
+    """Prometheus scrape target: needs "Authorization: Bearer <METRICS_TOKEN>" or a staff login."""
+
+    def has_token(self, request):
+        token = settings.METRICS_TOKEN
+        authorization = request.headers.get("Authorization", "")
+        return bool(token) and secrets.compare_digest(authorization.encode(), f"Bearer {token}".encode())
+
+    def get(self, request):
+        if not (self.has_token(request) or request.user.is_superuser or request.user.is_staff):
+            return HttpResponse(status=401)
+        return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 class AdjustCustomerCreditView(AdminRequiredMixin, View):
     """Admin can adjust a customer's credit score"""
 
@@ -442,12 +690,28 @@ class UpdateLoanSettingsView(AdminRequiredMixin, View):
         settings.save()
         return redirect("loans:admin_dashboard")
 
+@method_decorator(read_from_replica, name="dispatch")
 class AdminCustomerListView(AdminRequiredMixin, View):
     template_name = "loans/admin_customers.html"
 
     def get(self, request):
-        customers = Customer.objects.select_related("agent").all()
-        return render(request, self.template_name, {"customers": customers})
+        customers = Customer.objects.select_related("agent__user").only(
+            "id", "name", "phone", "location", "credit_score", "agent",
+            "agent__user__username", "agent__user__first_name", "agent__user__last_name",
+        )
+        if request.GET.get("agent", "").isdigit():
+            customers = customers.filter(agent_id=request.GET["agent"])
+        customers = _filter_customers(customers, request.GET)
+
+        sort = request.GET.get("sort") if request.GET.get("sort") in CUSTOMER_SORTS else "name"
+        context = _keyset_page(request, customers, CUSTOMER_SORTS[sort])
+        context.update({
+            "customers": context["page"].object_list,
+            "agents": AgentProfile.objects.select_related("user").only("id", "user__username").order_by("user__username"),
+            "sort": sort,
+            "credit_bands": Customer.CREDIT_BANDS,
+        })
+        return render(request, self.template_name, context)
     
 class AdminCustomerEditView(AdminRequiredMixin, View):
     template_name = "loans/admin_edit_customer.html"
@@ -492,11 +756,10 @@ class AdminCustomerEditView(AdminRequiredMixin, View):
 
         customer.has_active_loan = request.POST.get("has_active_loan") == "on"
 
-        customer.save()
+        customer.save()  # moves the expected collections if the agent changed
         messages.success(request, f"{customer.name}'s details updated successfully.")
         return redirect("loans:admin_customers")
     
-import secrets
 from django.urls import reverse
 from accounts.models import AgentProfile,RegistrationToken
 
@@ -504,9 +767,20 @@ class AdminAgentsView(AdminRequiredMixin, View):
     """Admin can manage agents: view, edit, and generate invite links"""
     template_name = "loans/admin_agents.html"
 
+    sorts = {
+        "username": ("user__username", "id"),
+        "newest": ("-id",),
+        "oldest": ("id",),
+    }
+
     def get(self, request):
-        agents = AgentProfile.objects.select_related("user").all()
-        return render(request, self.template_name, {"agents": agents})
+        agents = AgentProfile.objects.select_related("user").only(
+            "id", "user__username", "user__first_name", "user__last_name", "user__email", "user__date_joined",
+        )
+        sort = request.GET.get("sort") if request.GET.get("sort") in self.sorts else "username"
+        context = _keyset_page(request, agents, self.sorts[sort])
+        context.update({"agents": context["page"].object_list, "sort": sort})
+        return render(request, self.template_name, context)
 
 from django.utils.decorators import method_decorator
 from django.contrib.auth.decorators import user_passes_test
@@ -596,21 +870,29 @@ class AdminApproveTransactionView(UserPassesTestMixin, View):
         actual_amount = request.POST.get('actual_amount')
         rejection_note = request.POST.get('rejection_note')
 
+        if transaction_request.status != 'pending':
+            messages.warning(request, "This request has already been handled.")
+            return redirect('loans:admin_dashboard')
+
         if action == 'approve':
             amount = transaction_request.requested_amount
             if actual_amount:
                 try:
-                    amount = float(actual_amount)
-                except ValueError:
+                    amount = Decimal(actual_amount)
+                except InvalidOperation:
+                    amount = None
+                if amount is None or not amount.is_finite() or amount <= 0:
                     messages.error(request, "Invalid amount entered.")
                     return redirect('loans:admin_dashboard')
 
-            # Approve and subtract
-            transaction_request.status = 'approved'
-            transaction_request.actual_received_amount = amount
-            transaction_request.agent.amount_in_hand -= amount
-            transaction_request.agent.save()
-            transaction_request.save()
+            # Approve and subtract (the ledger entry and balance move together)
+            with transaction.atomic():
+                # Lock the request so a double submit can't approve it twice
+                locked = AdminTransactionRequest.objects.select_for_update().get(pk=transaction_request.pk)
+                if locked.status != 'pending':
+                    messages.warning(request, "This request has already been handled.")
+                    return redirect('loans:admin_dashboard')
+                locked.approve(amount)
             messages.success(request, f"Approved {transaction_request.agent.user.username}'s request of {amount}.")
 
         elif action == 'reject':
@@ -626,7 +908,7 @@ class AdminApproveTransactionView(UserPassesTestMixin, View):
 def admin_required(user):
     return user.is_staff or user.is_superuser
 
-@method_decorator([login_required, user_passes_test(admin_required)], name='dispatch')
+@method_decorator([login_required, user_passes_test(admin_required), read_from_replica], name='dispatch')
 class AgentDetailView(View):
     def get(self, request, agent_id):
         agent = get_object_or_404(AgentProfile, id=agent_id)
@@ -647,8 +929,7 @@ class AdminGiveAgentMoneyView(View):
             return redirect("loans:agent_detail", agent_id=agent.id)
 
         # Add money to agent's amount_in_hand
-        agent.amount_in_hand += amount
-        agent.save()
+        post_entry(agent, amount, "topup")
 
         messages.success(request, f"{amount} SZL successfully given to {agent.user.get_full_name()}.")
         return redirect("loans:agent_detail", agent_id=agent.id)
\ No newline at end of file
@@ -3,6 +3,12 @@ ASGI config for microfinance project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving through here switches the read-heavy pages to their async views
+(settings.ASGI) and database connections to a pool. Run it with the same
+gunicorn.conf.py as the WSGI app:
+
+    gunicorn microfinance.asgi -k uvicorn_worker.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +18,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'microfinance.settings')
+os.environ.setdefault('ASGI', 'True')
 
 application = get_asgi_application()
@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from decouple import config
+from decouple import Choices, config
 import dj_database_url
 from datetime import timedelta
 
@@ -30,6 +30,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # for static files in production
+    'loans.metrics.MetricsMiddleware',  # Prometheus request metrics, served at /metrics
+    'loans.profiler.RequestProfilerMiddleware',  # samples SQL/latency; see REQUEST_PROFILER_*
+    'loans.replicas.ReplicaPinMiddleware',  # replica reads and read-your-writes; see DATABASE_REPLICA_URL
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -57,6 +60,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'microfinance.wsgi.application'
+ASGI_APPLICATION = 'microfinance.asgi.application'
+# Set by microfinance/asgi.py: route the read-heavy pages to loans.async_views
+ASGI = config("ASGI", default=False, cast=bool)
 
 # Database (PostgreSQL for production)
 import dj_database_url
@@ -86,15 +92,63 @@ if DATABASE_URL:
             'OPTIONS': dict(parse_qsl(tmpPostgres.query)),
         }
     }
+    # Trigram lookups for customer search (loans.search)
+    INSTALLED_APPS.append('django.contrib.postgres')
 else:
     # Fallback to SQLite if no DATABASE_URL is found (optional)
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            # SQLite has no row locks: take the write lock when a transaction
+            # starts and wait for it, instead of failing with "database is locked"
+            'OPTIONS': {
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
         }
     }
 
+# Optional read replica for reports, exports and admin lists (loans.replicas).
+# Tests mirror it to the default database.
+DATABASE_REPLICA_URL = config("DATABASE_REPLICA_URL", default="")
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = {**dj_database_url.parse(DATABASE_REPLICA_URL), 'TEST': {'MIRROR': 'default'}}
+DATABASE_ROUTERS = ['loans.replicas.ReplicaRouter']
+# Seconds a user's reads stay on the primary after they write something
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=10, cast=int)
+
+# Database connections, for every database above:
+#   fresh       open and close a connection per request (Django's default)
+#   persistent  each worker thread keeps its connection for DB_CONN_MAX_AGE seconds,
+#               checked before reuse in a new request
+#   pool        a psycopg 3 pool per worker process, DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE
+#               connections, waiting up to DB_POOL_TIMEOUT seconds for a free one.
+#               PostgreSQL only; SQLite falls back to persistent, or to fresh under ASGI.
+# Under ASGI, where Django advises against persistent connections, the default is pool.
+# Behind PgBouncer in transaction mode, set DB_DISABLE_SERVER_SIDE_CURSORS: the named
+# cursors QuerySet.iterator() uses (CSV exports) don't survive across transactions there.
+DB_CONN_MODE = config(
+    "DB_CONN_MODE", default="pool" if ASGI else "persistent", cast=Choices(["fresh", "persistent", "pool"])
+)
+DB_CONN_MAX_AGE = config("DB_CONN_MAX_AGE", default=60, cast=int)
+DB_POOL_MIN_SIZE = config("DB_POOL_MIN_SIZE", default=2, cast=int)
+DB_POOL_MAX_SIZE = config("DB_POOL_MAX_SIZE", default=10, cast=int)
+DB_POOL_TIMEOUT = config("DB_POOL_TIMEOUT", default=10, cast=float)
+DB_DISABLE_SERVER_SIDE_CURSORS = config("DB_DISABLE_SERVER_SIDE_CURSORS", default=False, cast=bool)
+
+for database in DATABASES.values():
+    if DB_CONN_MODE == "pool" and database['ENGINE'] == 'django.db.backends.postgresql':
+        database['CONN_MAX_AGE'] = 0  # the pool keeps connections open instead
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    elif DB_CONN_MODE == "persistent" or (DB_CONN_MODE == "pool" and not ASGI):
+        database['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+        database['CONN_HEALTH_CHECKS'] = True
+    database['DISABLE_SERVER_SIDE_CURSORS'] = DB_DISABLE_SERVER_SIDE_CURSORS
 
 
 # Password validation
@@ -126,6 +180,36 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'loans:agent_dashboard'
 LOGOUT_REDIRECT_URL = 'login'
 
+# Cache used by the business calendar, PAR reports and admin totals. Memory is
+# per process, so signal invalidation only reaches the worker that made the
+# change; point CACHE_BACKEND/CACHE_LOCATION at a file or shared cache for all.
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache"),
+        'LOCATION': config("CACHE_LOCATION", default=""),
+    }
+}
+# Longest the admin dashboard totals are served without a recompute
+ADMIN_TOTALS_CACHE_SECONDS = config("ADMIN_TOTALS_CACHE_SECONDS", default=300, cast=int)
+
+# Request profiling (loans.profiler): share of requests sampled, ring buffer
+# size per process, and how often samples are written to RequestProfile (0 = never)
+REQUEST_PROFILER_SAMPLE_RATE = config("REQUEST_PROFILER_SAMPLE_RATE", default=1.0 if DEBUG else 0.05, cast=float)
+REQUEST_PROFILER_BUFFER_SIZE = config("REQUEST_PROFILER_BUFFER_SIZE", default=1000, cast=int)
+REQUEST_PROFILER_FLUSH_EVERY = config("REQUEST_PROFILER_FLUSH_EVERY", default=0, cast=int)
+
+# Prometheus metrics (loans.metrics). With a PROMETHEUS_MULTIPROC_DIR, each process keeps
+# its samples in mmap files there so /metrics adds up every worker; gunicorn.conf.py picks
+# one when unset and empties it on start. Without one (tests, runserver, management
+# commands) metrics stay in the process. prometheus_client reads the environment
+# variable, so it is exported before any import.
+PROMETHEUS_MULTIPROC_DIR = config("PROMETHEUS_MULTIPROC_DIR", default="")
+if PROMETHEUS_MULTIPROC_DIR:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = PROMETHEUS_MULTIPROC_DIR
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+# Scrapers send "Authorization: Bearer <token>"; without a token only staff logins can read it
+METRICS_TOKEN = config("METRICS_TOKEN", default="")
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -1,10 +1,12 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.views.generic import RedirectView
+from loans.views import MetricsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("loans/", include("loans.urls", namespace="loans")),
+    path('metrics', MetricsView.as_view(), name='metrics'),
     path('accounts/', include('accounts.urls')),
     path('', RedirectView.as_view(url='/accounts/login/')),
 ]